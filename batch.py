@@ -0,0 +1,100 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import io
+import json
+import os
+import re
+import time
+import traceback
+from typing import Dict, List
+
+import main
+
+# Manifest format (JSON):
+# {"args": ["--retire_players", ...], "saves": [{"name": "EHEC", "players": "...", "config_teams": "...",
+#  "output": "...", "args": ["--signings", "..."]}, ...]}
+# Top-level args apply to every save; each save's own args are appended after them
+# Output paths that every save would otherwise share get the save's name appended, e.g. profile_EHEC.json
+args_per_save = ('--journal', '--profile')
+
+
+def get_argv(save: Dict, args_shared: List[str]) -> List[str]:
+    argv = ['--players', save['players'], '--config_teams', save['config_teams']]
+    if save.get('output') is not None:
+        argv.extend(('--output', save['output']))
+    argv += list(args_shared) + list(save.get('args', ()))
+    for idx, arg in enumerate(argv):
+        name, sep, value = arg.partition('=')
+        if name in args_per_save:
+            if sep:
+                argv[idx] = f'{name}={get_path_save(value, save["name"])}'
+            elif idx + 1 < len(argv):
+                argv[idx + 1] = get_path_save(argv[idx + 1], save['name'])
+    return argv
+
+
+def get_path_save(filename: str, name: str) -> str:
+    root, extension = os.path.splitext(filename)
+    return f"{root}_{re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_')}{extension}"
+
+
+def read_manifest(filename: str) -> Dict:
+    with open(filename, encoding='UTF-8') as file:
+        manifest = json.load(file)
+    for idx, save in enumerate(manifest.get('saves', [])):
+        missing = [key for key in ('players', 'config_teams') if key not in save]
+        if missing:
+            raise RuntimeError(f'Manifest {filename} save #{idx} is missing required keys: {missing}')
+        save.setdefault('name', save['players'])
+    return manifest
+
+
+def run_save(save: Dict, args_shared: List[str]) -> Dict:
+    # Runs in a worker process, which has its own teams.registry
+    result = {'name': save['name'], 'errors': [], 'warnings': [], 'results': [], 'failure': None}
+    log = io.StringIO()
+    time_begin = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            ctx = main.run(main.parse_args(get_argv(save, args_shared)))
+        result['errors'], result['warnings'], result['results'] = ctx.errors, ctx.warnings, ctx.results
+    except BaseException:
+        result['failure'] = traceback.format_exc()
+    result['seconds'] = time.perf_counter() - time_begin
+    result['log'] = log.getvalue().splitlines()
+    return result
+
+
+def run_batch(manifest: Dict, args_shared: List[str] = None, max_workers: int = None) -> List[Dict]:
+    args_shared = list(manifest.get('args', [])) + list(args_shared or [])
+    saves = manifest.get('saves', [])
+    results = {}
+    # A fresh process per save, so no module state (team registry, profiling) carries over from another save
+    with ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=1) as executor:
+        futures = {executor.submit(run_save, save, args_shared): idx for idx, save in enumerate(saves)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return [results[idx] for idx in range(len(saves))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run main.py over several league saves in parallel",
+                                     epilog="Any other arguments are passed to main.py for every save")
+    parser.add_argument('--manifest', required=True, type=str, help='JSON manifest of saves')
+    parser.add_argument('--max_workers', default=None, type=int)
+    parser.add_argument('--report', default=None, type=str, help='Path to write a JSON report to')
+    args, args_shared = parser.parse_known_args()
+
+    results = run_batch(read_manifest(args.manifest), args_shared=args_shared, max_workers=args.max_workers)
+    for result in results:
+        status = 'FAILED' if result['failure'] else f"{len(result['errors'])} errors"
+        print(f"{result['name']}: {status}, {len(result['warnings'])} warnings, {len(result['results'])} results"
+              f" ({result['seconds']:.2f}s)")
+        for error in result['errors']:
+            print(f"  {error}")
+        if result['failure']:
+            print(result['failure'])
+    if args.report is not None:
+        with open(args.report, 'w', encoding='UTF-8') as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+entry_points = ('batch', 'bids', 'buyout', 'history', 'import_schedule', 'main', 'parse_bids', 'scouting', 'server',
+                'similarity', 'simulate', 'watch')
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    # Cumulative microseconds per module from python -X importtime
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = max(times.get(name.strip(), 0), int(cumulative))
+    return times
+
+
+def measure(module: str, n_top: int = 5, repeats: int = 3) -> Dict:
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    seconds = []
+    for _ in range(repeats):
+        time_begin = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=cwd,
+                                 capture_output=True, text=True)
+        seconds.append(time.perf_counter() - time_begin)
+        if process.returncode != 0:
+            raise RuntimeError(f'Importing {module} failed: {process.stderr.splitlines()[-1]}')
+    times = parse_importtime(process.stderr)
+    top = sorted(((name, value) for name, value in times.items() if '.' not in name and name != module),
+                 key=lambda x: -x[1])[:n_top]
+    return {
+        'module': module,
+        'seconds': min(seconds),
+        'import_seconds': times.get(module, 0)/1e6,
+        'heaviest': {name: value/1e6 for name, value in top},
+    }
+
+
+def run(modules: List[str], n_top: int = 5, repeats: int = 3) -> List[Dict]:
+    return [measure(module, n_top=n_top, repeats=repeats) for module in modules]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the startup cost of each entry point with python -X importtime")
+    parser.add_argument('modules', nargs='*', default=list(entry_points))
+    parser.add_argument('--max_seconds', default=None, type=float,
+                        help='Exit with an error if any entry point takes longer than this to start')
+    parser.add_argument('--n_top', default=5, type=int, help='Heaviest top-level imports to list per entry point')
+    parser.add_argument('--output', default=None, type=str, help='Path to write a JSON report to')
+    parser.add_argument('--repeats', default=3, type=int, help='Runs per entry point; the fastest is reported')
+    args = parser.parse_args()
+
+    results = run(args.modules, n_top=args.n_top, repeats=args.repeats)
+    for result in results:
+        heaviest = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in result['heaviest'].items())
+        print(f"{result['module']}: {result['seconds']:.3f}s total, {result['import_seconds']:.3f}s importing"
+              f" ({heaviest})")
+    if args.output is not None:
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            json.dump(results, file, indent=2)
+    if args.max_seconds is not None:
+        slow = [result['module'] for result in results if result['seconds'] > args.max_seconds]
+        if slow:
+            sys.exit(f'Entry points slower than {args.max_seconds}s to start: {slow}')
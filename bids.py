@@ -0,0 +1,221 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+from typing import Dict, Iterable, Iterator, Tuple
+
+import contracts as cntr
+import players as plyr
+import salary_cap
+import teams
+
+separator_posted = ' » '
+# A last post's manager line starts with one of these; names containing 'by ' elsewhere aren't manager lines
+prefixes_manager = ('Last post by ', 'by ')
+time_format_default = '%a %b %d, %Y %I:%M %p'
+encoding_default = 'UTF-8'
+
+
+@dataclass(frozen=True)
+class Bid:
+    player: str
+    manager: str
+    time_posted: datetime
+    time_last: datetime
+    team: teams.Team = None
+    line: int = None
+    salary: int = cntr.salary_min_league
+    years: int = 1
+
+    def is_complete(self, now: datetime, days_posted: int = 2, days_last: int = 1) -> bool:
+        return ((now - self.time_posted).days >= days_posted) and ((now - self.time_last).days >= days_last)
+
+
+class Managers:
+    ids_team: Dict[str, int] = None
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return ' '.join(name.split()).casefold()
+
+    def get(self, name: str, default: int = None) -> int:
+        return self.ids_team.get(Managers.normalize(name), default)
+
+    def __contains__(self, name: str) -> bool:
+        return Managers.normalize(name) in self.ids_team
+
+    def __len__(self):
+        return len(self.ids_team)
+
+    def __init__(self, ids_team: Dict[str, int] = None):
+        self.ids_team = {}
+        if ids_team is not None:
+            for name, id_team in ids_team.items():
+                self.ids_team[Managers.normalize(name)] = id_team
+
+
+def parse_terms(title: str) -> Tuple[str, int, int]:
+    # Topic titles may end with the offer, as "<name> <salary> <N>y" or "<name> <N>y <salary>"
+    tokens = title.rsplit(' ', 2)
+    if len(tokens) == 3:
+        for idx_length, idx_salary in ((2, 1), (1, 2)):
+            length, salary = tokens[idx_length], tokens[idx_salary]
+            if cntr.is_length(length) and cntr.is_salary(salary):
+                return tokens[0], cntr.parse_salary(salary), cntr.parse_length(length)
+    return title, cntr.salary_min_league, 1
+
+
+# Forum timestamps have minute resolution, so the same strings recur throughout a thread
+@lru_cache(maxsize=4096)
+def parse_time(string: str, time_format: str = time_format_default) -> datetime:
+    return datetime.strptime(string, time_format)
+
+
+def read_bids(lines: Iterable[str], time_format: str = time_format_default,
+              managers: Managers = None) -> Iterator[Bid]:
+    # States: find the "by author » time" line of a new topic, then the "by manager" line of its last post, then
+    # the last post's timestamp on the following non-blank line
+    player, line_player, manager, time_posted = None, None, None, None
+    line_prev, idx_prev = None, None
+    for idx, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if time_posted is None:
+            if separator_posted in line:
+                try:
+                    time_posted = parse_time(line.rsplit(separator_posted, 1)[1], time_format)
+                except ValueError as err:
+                    raise RuntimeError(f"Can't parse topic timestamp on line number {idx}: {err}")
+                if line_prev is None:
+                    raise RuntimeError(f"Topic timestamp on line number {idx} has no player name line before it")
+                player, line_player = line_prev, idx_prev
+            line_prev, idx_prev = line, idx
+        elif manager is None:
+            if separator_posted in line:
+                raise RuntimeError(f"Bid for {player} on line number {line_player} has no last post before the next"
+                                   f" topic on line number {idx}")
+            prefix = next((prefix for prefix in prefixes_manager if line.startswith(prefix)), None)
+            if prefix is not None:
+                manager = line[len(prefix):]
+        else:
+            try:
+                time_last = parse_time(line, time_format)
+            except ValueError as err:
+                raise RuntimeError(f"Can't parse last post timestamp for {player} on line number {idx}: {err}")
+            id_team = managers.get(manager) if managers is not None else None
+            name, salary, years = parse_terms(player)
+            yield Bid(
+                player=name, manager=manager, time_posted=time_posted, time_last=time_last,
+                team=teams.registry.get_team(id_team) if id_team is not None else None, line=line_player,
+                salary=salary, years=years,
+            )
+            player, line_player, manager, time_posted = None, None, None, None
+            line_prev, idx_prev = None, None
+    if time_posted is not None:
+        raise RuntimeError(f"Bid for {player} on line number {line_player} is incomplete at end of input")
+
+
+def read_managers(filename: str, encoding=encoding_default) -> Managers:
+    # One "<team id or acronym> - <manager>" per line, like the qualified RFA files
+    ids_team = {}
+    with open(filename, encoding=encoding) as file:
+        for idx, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            team, sep, name = line.partition(' - ')
+            if not (sep and name.strip()):
+                raise RuntimeError(f"Can't parse '<team> - <manager>' from {filename} on line number {idx}: {line}")
+            team = team.strip()
+            try:
+                # Farm ids and acronyms stand for their parent team
+                value = int(team) if team.isdigit() else teams.registry.by_acronym(team).value
+                id_team = teams.registry.get_team(value).value
+            except (KeyError, ValueError):
+                raise RuntimeError(f"Unknown team={team} in {filename} on line number {idx}")
+            if not teams.registry.is_nhl(id_team):
+                raise RuntimeError(f"Team={team} in {filename} on line number {idx} is not an NHL team")
+            ids_team[name.strip()] = id_team
+    return Managers(ids_team)
+
+
+def resolve_bids(players: plyr.Players, bids: Iterable[Bid], cap_max: int = None):
+    if cap_max is None:
+        cap_max = salary_cap.cap_league
+    errors = []
+    warnings = []
+    results = []
+    signings = {}
+
+    bids_player = defaultdict(list)
+    for bid in bids:
+        bids_player[bid.player].append(bid)
+    for bids_sorted in bids_player.values():
+        # Best offer first: highest salary, then longest term, then earliest bid
+        bids_sorted.sort(key=lambda bid: (-bid.salary, -bid.years, bid.time_last))
+
+    tab = players.table
+    caps = salary_cap.compute_caps(players)
+    pids, salaries, years, ids_team = [], [], [], []
+    matched = {}
+    # Resolve the earliest-settled players first so that they get first claim on cap space
+    for name_full, bids_sorted in sorted(bids_player.items(), key=lambda item: item[1][0].time_last):
+        try:
+            pid = players.find_player_by_fullname(name_full, matched=matched)
+            if name_full in matched:
+                warnings.append(players.describe_matched(name_full, pid))
+        except NameError:
+            errors.append(players.describe_unfound(name_full))
+            continue
+        if tab.at[pid, 'years'] != 0:
+            errors.append(f"Player {name_full} can't be signed as free agent with years={tab.at[pid, 'years']} > 0")
+            continue
+        winner = None
+        for bid in bids_sorted:
+            if bid.team is None:
+                warnings.append(f"Player {name_full} bid by unknown manager={bid.manager} (line {bid.line}) ignored")
+                continue
+            if not ((0 < bid.years <= cntr.years_max_league) and (
+                    cntr.get_salary_min(bid.years) <= bid.salary <= cntr.salary_max_league)):
+                warnings.append(f"Player {name_full} bid {bid.years}y {bid.salary} by {bid.team.name}"
+                                f" (line {bid.line}) is not a valid contract")
+                continue
+            if caps[bid.team] + bid.salary > cap_max:
+                warnings.append(f"Player {name_full} bid {bid.years}y {bid.salary} by {bid.team.name}"
+                                f" (line {bid.line}) exceeds cap space={cap_max - caps[bid.team]}")
+                continue
+            winner = bid
+            break
+        if winner is None:
+            errors.append(f"Player {name_full} has no valid bids out of {len(bids_sorted)}")
+            continue
+        caps[winner.team] += winner.salary
+        pids.append(pid)
+        salaries.append(winner.salary)
+        years.append(winner.years)
+        ids_team.append(winner.team.value)
+
+    if pids:
+        ids_team = np.array(ids_team)
+        players.set_values(pids, 'salary', salaries)
+        players.set_values(pids, 'years', years)
+        players.set_values(pids, 'rights', ids_team)
+        players.set_values(pids, 'team', ids_team)
+        players.set_values(pids, 'acquired', "signed as a free agent")
+        for pid in pids:
+            player = players.get_player(pid)
+            name_full = f"{player.name_first} {player.name_last}"
+            results.append(f"Player {name_full} ({player.rights.name}) signing: {player.years}y {player.salary:d}")
+            signings[name_full] = player
+
+    return errors, warnings, results, signings
+
+
+def summarize_unknown_managers(bids: Iterable[Bid]) -> Dict[str, list]:
+    unknown = defaultdict(list)
+    for bid in bids:
+        if bid.team is None:
+            unknown[bid.manager].append(bid)
+    return unknown
@@ -0,0 +1,30 @@
+import pytest
+
+import bids
+
+
+def test_read_managers(tmp_path, registry):
+    filename = tmp_path / 'managers.txt'
+    filename.write_text('# comment\n1 - One GM\nT02 - Two  GM\n7 - Farm Three GM\nF04 - Farm Four GM\n')
+    managers = bids.read_managers(str(filename))
+    assert len(managers) == 4
+    assert managers.get('one gm') == 1
+    assert managers.get('Two GM') == 2
+    # Farm ids and acronyms map to the parent team
+    assert managers.get('Farm Three GM') == 3
+    assert managers.get('Farm Four GM') == 4
+
+
+@pytest.mark.parametrize('team', ['0', '98', '99', '9', 'XYZ'])
+def test_read_managers_bad_team(tmp_path, registry, team):
+    filename = tmp_path / 'managers.txt'
+    filename.write_text(f'1 - One GM\n{team} - Bad GM\n')
+    with pytest.raises(RuntimeError, match='line number 2'):
+        bids.read_managers(str(filename))
+
+
+def test_read_managers_bad_line(tmp_path, registry):
+    filename = tmp_path / 'managers.txt'
+    filename.write_text('1 - One GM\n\n2 One GM\n')
+    with pytest.raises(RuntimeError, match='line number 3'):
+        bids.read_managers(str(filename))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import argparse
+import numpy as np
+
+import contracts as cntr
+import lazy
+import players as plyr
+import salary_cap
+import teams
+
+pd = lazy.load('pandas')
+
+rules = ('old', 'new')
+
+
+def get_cap_hits(salaries, years, rule: str = 'new', n_seasons: int = cntr.years_max_league,
+                 spread: int = 1) -> np.ndarray:
+    # Buyout cap hit per player (rows) for this and each following season (columns)
+    # The cost of each remaining contract year is charged over spread seasons
+    costs = get_costs(salaries, rule=rule)/spread
+    seasons = np.arange(n_seasons)
+    return np.where(seasons[np.newaxis, :] < spread*np.asarray(years)[:, np.newaxis], costs[:, np.newaxis], 0.)
+
+
+def get_costs(salaries, rule: str = 'new') -> np.ndarray:
+    # Cost of buying out one remaining contract year at the given salary
+    salaries = np.asarray(salaries, dtype=float)
+    if rule == 'old':
+        costs = salaries*(0.5 + 0.25*(salaries > 2.5e6))
+    elif rule == 'new':
+        costs = salaries*0.75 - 3e5
+    else:
+        raise ValueError(f'Unknown buyout rule={rule}; must be one of {rules}')
+    return np.maximum(costs, 0.)
+
+
+def get_candidates(players: plyr.Players, rule: str = 'new', n_best: int = None) -> pd.DataFrame:
+    # Every signed player's buyout under both rules, ranked within their team by this season's savings under rule
+    tab = players.table
+    rows = np.flatnonzero(salary_cap.is_signed(players))
+    salaries, years = tab.salary.to_numpy()[rows], tab.years.to_numpy()[rows]
+    candidates = pd.DataFrame({
+        'row': rows,
+        'name_first': tab.name_first.to_numpy()[rows],
+        'name_last': tab.name_last.to_numpy()[rows],
+        'rights': tab.rights.to_numpy()[rows],
+        'salary': salaries,
+        'years': years,
+    })
+    for name in rules:
+        costs = get_costs(salaries, rule=name)
+        candidates[f'cost_{name}'] = (costs*years).astype(np.int64)
+        candidates[f'savings_{name}'] = (salaries - costs).astype(np.int64)
+    candidates['rank'] = candidates.groupby('rights')[f'savings_{rule}'].rank(
+        ascending=False, method='first').astype(np.int64)
+    candidates = candidates.sort_values(['rights', 'rank'], ignore_index=True)
+    if n_best is not None:
+        candidates = candidates[candidates['rank'] <= n_best].reset_index(drop=True)
+    return candidates
+
+
+def project_caps(players: plyr.Players, rows, rule: str = 'new', n_seasons: int = cntr.years_max_league,
+                 spread: int = 1) -> np.ndarray:
+    # salary_cap.project_caps with the given players bought out
+    rows = np.asarray(rows, dtype=np.int64)
+    unsigned = rows[~salary_cap.is_signed(players)[rows]]
+    if len(unsigned) > 0:
+        raise ValueError(f'Only signed players can be bought out; rows={unsigned.tolist()} are not')
+    tab = players.table
+    caps = salary_cap.project_caps(players, n_seasons=n_seasons, excluded=rows)
+    hits = get_cap_hits(tab.salary.to_numpy()[rows], tab.years.to_numpy()[rows], rule=rule, n_seasons=n_seasons,
+                        spread=spread)
+    rights = tab.rights.to_numpy()[rows]
+    for season in range(n_seasons):
+        caps[:, season] += np.bincount(rights, weights=hits[:, season],
+                                       minlength=teams.registry.n_teams + 1).astype(np.int64)
+    return caps
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rank buyout candidates for every team")
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--config_teams', required=True, type=str)
+    parser.add_argument('--n_best', default=5, type=int, help='Candidates to list per team')
+    parser.add_argument('--output', default=None, type=str, help='Path to write all candidates to as csv')
+    parser.add_argument('--rule', default='new', choices=rules)
+    args = parser.parse_args()
+
+    registry = teams.read_teams(args.config_teams)
+    players = plyr.Players(args.players)
+    candidates = get_candidates(players, rule=args.rule)
+    if args.output is not None:
+        candidates.to_csv(args.output, index=False)
+    caps = salary_cap.compute_caps(players)
+    for rights, team_candidates in candidates[candidates['rank'] <= args.n_best].groupby('rights'):
+        team = registry.get_team(rights)
+        print(f"{team.name} ({caps[rights]/1e6:.3f}M of {salary_cap.cap_league/1e6:.3f}M cap):")
+        for row in team_candidates.itertuples():
+            print(f"  {row.name_first} {row.name_last} {row.years}y {row.salary/1e6:.3f}M saves"
+                  f" {getattr(row, f'savings_{args.rule}')/1e6:.3f}M/y for {getattr(row, f'cost_{args.rule}')/1e6:.3f}M")
@@ -1,14 +1,18 @@
-import matplotlib.pyplot as plt
 import numpy as np
 
-salaries = np.arange(6e5, 6e6, 1e5)
-buyout_old = salaries*(0.5 + 0.25*(salaries > 2.5e6))
-buyout_new = salaries*0.75 - 3e5
+import buyout
 
-fig, ax = plt.subplots(ncols=2)
-ax[0].plot(salaries, buyout_old)
-ax[0].plot(salaries, buyout_new)
-ax[1].plot(salaries, buyout_old/salaries)
-ax[1].plot(salaries, buyout_new/salaries)
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
 
-plt.show()
+    salaries = np.arange(6e5, 6e6, 1e5)
+    buyout_old = buyout.get_costs(salaries, rule='old')
+    buyout_new = buyout.get_costs(salaries, rule='new')
+
+    fig, ax = plt.subplots(ncols=2)
+    ax[0].plot(salaries, buyout_old)
+    ax[0].plot(salaries, buyout_new)
+    ax[1].plot(salaries, buyout_old/salaries)
+    ax[1].plot(salaries, buyout_new/salaries)
+
+    plt.show()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+import lazy
+
+pd = lazy.load('pandas')
+
+# Arrow-based formats; pandas needs pyarrow installed to read or write either
+extensions = ('feather', 'parquet')
+
+
+def get_extension(filename: str) -> str:
+    return filename.rsplit('.', 1)[-1].lower()
+
+
+def is_columnar(filename: str) -> bool:
+    return get_extension(filename) in extensions
+
+
+def read(filename: str, dtypes: Dict[str, str], columns: Iterable[str] = None) -> pd.DataFrame:
+    if columns is not None:
+        columns = list(columns)
+        unknown = [column for column in columns if column not in dtypes]
+        if unknown:
+            raise ValueError(f'Unknown columns={unknown} requested from filename={filename}')
+    extension = get_extension(filename)
+    if extension == 'parquet':
+        table = pd.read_parquet(filename, columns=columns)
+    elif extension == 'feather':
+        table = pd.read_feather(filename, columns=columns)
+    else:
+        raise ValueError(f'Unknown columnar extension for filename={filename}')
+    return table.astype({column: dtypes[column] for column in table.columns if column in dtypes})
+
+
+def write(table: pd.DataFrame, filename: str, dtypes: Dict[str, str]):
+    table = table.astype({column: dtype for column, dtype in dtypes.items() if column in table.columns})
+    extension = get_extension(filename)
+    if extension == 'parquet':
+        table.to_parquet(filename, index=False)
+    elif extension == 'feather':
+        table.reset_index(drop=True).to_feather(filename)
+    else:
+        raise ValueError(f'Unknown columnar extension for output filename={filename}')
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import columnar
+import players as plyr
+import schedule as sched
+
+
+def make_players_ehm(n_players: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    lines = [f' {n_players} \n']
+    for idx in range(n_players):
+        for idx_col, cols in enumerate(plyr.names_columns):
+            if plyr.Players.column_is_numeric(idx_col):
+                lines.append(''.join(f' {value} ' for value in rng.integers(0, 100, len(cols))) + '\n')
+            elif idx_col == 13:
+                lines.append(f'Name{idx} Last Name{idx}\n')
+            elif idx_col == 16:
+                lines.append(''.join(f'{value:03d}' for value in rng.integers(0, 100, len(cols))) + '\n')
+            else:
+                lines.append(f'x{idx_col} é{idx}\n')
+    return ''.join(lines)
+
+
+def make_schedule_ehm(n_games: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    lines = [f' {n_games} \n']
+    for _ in range(n_games):
+        for cols in sched.names_columns:
+            lines.append(''.join(f' {value} ' for value in rng.integers(0, 30, len(cols))) + '\n')
+    return ''.join(lines)
+
+
+@pytest.mark.parametrize('extension', columnar.extensions)
+def test_players_round_trip(tmp_path, extension):
+    filename = tmp_path / 'players.ehm'
+    filename.write_text(make_players_ehm(5), encoding='cp1252')
+    players = plyr.Players(str(filename))
+    filename_columnar = str(tmp_path / f'players.{extension}')
+    players.write(filename_columnar)
+    players_columnar = plyr.Players(filename_columnar)
+    assert dict(players_columnar.table.dtypes.astype(str)) == dict(players.table.dtypes.astype(str))
+    filename_out = str(tmp_path / 'players_out.ehm')
+    players_columnar.write(filename_out)
+    assert filename.read_bytes() == (tmp_path / 'players_out.ehm').read_bytes()
+
+
+@pytest.mark.parametrize('extension', columnar.extensions)
+def test_schedule_round_trip(tmp_path, extension):
+    filename = tmp_path / 'schedule.ehm'
+    filename.write_text(make_schedule_ehm(7), encoding='cp1252')
+    schedule = sched.Schedule(str(filename))
+    filename_columnar = str(tmp_path / f'schedule.{extension}')
+    schedule.write(filename_columnar)
+    schedule_columnar = sched.Schedule(filename_columnar)
+    assert dict(schedule_columnar.table.dtypes.astype(str)) == dict(schedule.table.dtypes.astype(str))
+    filename_out = str(tmp_path / 'schedule_out.ehm')
+    schedule_columnar.write(filename_out)
+    assert filename.read_bytes() == (tmp_path / 'schedule_out.ehm').read_bytes()
@@ -0,0 +1,21 @@
+import pytest
+
+import teams
+
+
+def make_config_teams(n_teams: int) -> str:
+    lines = []
+    for idx in range(1, n_teams + 1):
+        lines += [f'Team {idx}', f'T{idx:02d}', f'Arena {idx}', '15000', '1']
+    lines.append(teams.sentinel)
+    for idx in range(1, n_teams + 1):
+        lines += [f'Farm {idx}', f'F{idx:02d}']
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def registry(tmp_path):
+    # A 4 team league, T01-T04 with farm teams F01-F04 as ids 5-8
+    filename = tmp_path / 'config_teams.ehm'
+    filename.write_text(make_config_teams(4))
+    return teams.read_teams(str(filename))
@@ -1,15 +1,19 @@
+from __future__ import annotations
+
 import logging
 from collections import defaultdict
 from dataclasses import dataclass
-from decimal import *
-import pandas as pd
-from typing import Dict
+import numpy as np
+import os
+from typing import Dict, Iterable, List, Tuple
 
+import lazy
 import players as plyr
 import teams
 
+pd = lazy.load('pandas')
+
 encoding_default = 'UTF-8'
-getcontext().prec = 10
 
 
 @dataclass
@@ -19,14 +23,40 @@ class Contract:
     team: teams.Team = None
 
 
+@dataclass
+class ContractLines:
+    # One entry per contract in file order; salary is -1 where the line doesn't give one and team -1 for extensions
+    names: List[str]
+    salaries: np.ndarray
+    years: np.ndarray
+    teams: np.ndarray
+    line_numbers: np.ndarray
+
+
 draft_slots_2020 = [0, 3000000, 2750000, 2500000, 2250000, 2000000, 1900000, 1800000, 1700000, 1600000, 1500000,
                     1450000, 1400000, 1350000, 1300000, 1250000]
+salary_multipliers = {'k': 1000, 'm': 1000000}
 salary_round = 50000
 salary_unsigned = 100000
 salary_min_league = 600000
 salary_max_league = 9000000
 years_max_league = 7
 
+# read_salaries_min results by (path, mtime)
+salaries_min_cache: Dict[Tuple[str, float], pd.Series] = {}
+
+# Bracket tables as (bounds, values) arrays for vectorized lookups
+# ELCs by first overall pick of each bracket
+elc_brackets_2019 = (np.array([1, 11, 21, 31, 41, 51, 61, 76, 91, 106]),
+                     np.array([2000000, 1600000, 1400000, 1200000, 1000000, 800000, 720000, 680000, 640000, 600000]))
+elc_brackets_2020 = (np.array(list(range(1, 15)) + [15, 17, 19, 21, 24, 27, 31, 35, 39, 43, 47, 51, 56, 61]),
+                     np.array(draft_slots_2020[1:15] + [1250000, 1200000, 1150000, 1100000, 1050000, 1000000, 950000,
+                                                      900000, 850000, 800000, 750000, 700000, 650000, 600000]))
+# Max years for salaries below each bound, and the last for any higher salary
+years_max_brackets = (np.array([800000, 1200000, 3000000, 5000000]), np.array([1, 2, 3, 5, 7]))
+# Min salary for contracts up to each length, and the last for any longer contract
+salary_min_brackets = (np.array([1, 2, 3, 5]), np.array([600000, 800000, 1200000, 3000000, 5000000]))
+
 
 def get_elc(player: plyr.Player, year_draft_max=None, check_contract=True, default_undrafted=False):
     if not player.draft_overall > 0:
@@ -42,109 +72,58 @@ def get_elc(player: plyr.Player, year_draft_max=None, check_contract=True, defau
     ):
         raise ValueError(f"Player: {player} is_booster and is_just_drafted from draft year={player.draft_year} "
                          f"> year_draft_max={year_draft_max}")
-    if player.draft_year >= 2020:
-        if player.draft_overall <= 14:
-            salary = draft_slots_2020[player.draft_overall]
-        elif player.draft_overall >= 61:
-            salary = 600000
-        elif player.draft_overall >= 56:
-            salary = 650000
-        elif player.draft_overall >= 51:
-            salary = 700000
-        elif player.draft_overall >= 47:
-            salary = 750000
-        elif player.draft_overall >= 43:
-            salary = 800000
-        elif player.draft_overall >= 39:
-            salary = 850000
-        elif player.draft_overall >= 35:
-            salary = 900000
-        elif player.draft_overall >= 31:
-            salary = 950000
-        elif player.draft_overall >= 27:
-            salary = 1000000
-        elif player.draft_overall >= 24:
-            salary = 1050000
-        elif player.draft_overall >= 21:
-            salary = 1100000
-        elif player.draft_overall >= 19:
-            salary = 1150000
-        elif player.draft_overall >= 17:
-            salary = 1200000
-        elif player.draft_overall >= 15:
-            salary = 1250000
-        else:
-            raise RuntimeError(f'Unhandled player={player} 2020+ draft slot for {player.draft_overall} OV'
-                               f' ({player.draft_year})')
-    else:
-        if player.draft_overall >= 106:
-            salary = 600000
-        elif player.draft_overall >= 91:
-            salary = 640000
-        elif player.draft_overall >= 76:
-            salary = 680000
-        elif player.draft_overall >= 61:
-            salary = 720000
-        elif player.draft_overall >= 51:
-            salary = 800000
-        elif player.draft_overall >= 41:
-            salary = 1000000
-        elif player.draft_overall >= 31:
-            salary = 1200000
-        elif player.draft_overall >= 21:
-            salary = 1400000
-        elif player.draft_overall >= 11:
-            salary = 1600000
-        elif player.draft_overall >= 1:
-            salary = 2000000
-        else:
-            raise RuntimeError(f'Unhandled player={player} 2019- draft slot for {player.draft_overall} OV'
-                               f' ({player.draft_year})')
+    salary = int(get_elc_salaries(player.draft_year, player.draft_overall))
+    if not salary > 0:
+        raise RuntimeError(f'Unhandled player={player} draft slot for {player.draft_overall} OV'
+                           f' ({player.draft_year})')
     return Contract(salary=salary, years=3)
 
 
+def get_elc_salaries(draft_years, draft_overalls) -> np.ndarray:
+    # Zero for undrafted players
+    draft_years, draft_overalls = np.asarray(draft_years), np.asarray(draft_overalls)
+    salaries = np.zeros(np.broadcast(draft_years, draft_overalls).shape, dtype=np.int64)
+    for new, (firsts, values) in ((False, elc_brackets_2019), (True, elc_brackets_2020)):
+        idx = np.searchsorted(firsts, draft_overalls, side='right') - 1
+        salaries = np.where((draft_years >= 2020) == new, np.where(idx >= 0, values[np.maximum(idx, 0)], 0), salaries)
+    return salaries
+
+
 def get_max_years(salary: int):
     if not salary > salary_min_league:
         raise ValueError(f"No valid contract length for salary={salary} !> salary_min_league={salary_min_league}")
-    if salary < 800000:
-        return 1
-    elif salary < 1200000:
-        return 2
-    elif salary < 3000000:
-        return 3
-    elif salary < 5000000:
-        return 5
-    else:
-        return 7
+    return int(get_max_years_array(salary))
+
+
+def get_max_years_array(salaries) -> np.ndarray:
+    return years_max_brackets[1][np.searchsorted(years_max_brackets[0], salaries, side='right')]
 
 
 def get_salary_min(years: int):
     if not years > 0:
         raise ValueError(f"No valid salary for contract years={years}")
-    if years <= 1:
-        return 600000
-    elif years <= 2:
-        return 800000
-    elif years <= 3:
-        return 1200000
-    elif years <= 5:
-        return 3000000
-    else:
-        return 5000000
+    return int(get_salary_min_array(years))
+
+
+def get_salary_min_array(years) -> np.ndarray:
+    return salary_min_brackets[1][np.searchsorted(salary_min_brackets[0], years, side='left')]
 
 
-def enter_contracts(players: plyr.Players, contracts: Dict[str, Contract], salaries_min: Dict[str, int],
-                    year_draft_max: int = None):
+def enter_contracts(players: plyr.Players, contracts: Dict[str, Contract], year_draft_max: int = None):
+    # Minimum salaries come from players.salaries_min, if joined
     errors = []
     warnings = []
     results = []
     resignings = {}
+    salaries_min = players.salaries_min
     if salaries_min is None:
         logging.warning("salaries_min not provided; will default to league minimum")
-        salaries_min = {}
+    matched = {}
     for name_full, contract in contracts.items():
         try:
-            pid = players.find_player_by_fullname(name_full)
+            pid = players.find_player_by_fullname(name_full, matched=matched)
+            if name_full in matched:
+                warnings.append(players.describe_matched(name_full, pid))
             player = players.get_player(pid)
             str_player = F"{name_full} ({player.rights.name})"
             if contract is not None:
@@ -172,7 +151,8 @@ def enter_contracts(players: plyr.Players, contracts: Dict[str, Contract], salar
                                          f" years={player.years}")
                 player.salary, player.years = salary, years
                 salary_min = min(
-                    max(int(salaries_min.get(name_full, salary_min_league)), get_salary_min(contract.years)),
+                    max(int(salaries_min[pid]) if salaries_min is not None else salary_min_league,
+                        get_salary_min(contract.years)),
                     salary_max_league,
                 ) if not is_free else salary_min_league
                 if (not is_free) and (player.salary == elc.salary) and (contract.years >= 5):
@@ -204,116 +184,156 @@ def enter_contracts(players: plyr.Players, contracts: Dict[str, Contract], salar
                            f" {contract.years}y {player.salary:d}")
             resignings[name_full] = player
         except NameError:
-            errors.append(f"Couldn't find player: {name_full} ({plyr.get_names(name_full)})")
+            errors.append(players.describe_unfound(name_full))
         except Exception as error:
             errors.append(f"Player {name_full} got error: {error}")
 
     return errors, warnings, results, resignings
 
 
+def get_column(line: str, tokens: List[str], idx: int) -> int:
+    # 1-based column of tokens[idx] within the line it was split from
+    position = 0
+    for token in tokens[:idx]:
+        position = line.index(token, position) + len(token)
+    return line.index(tokens[idx], position) + 1
+
+
+def is_length(token: str) -> bool:
+    return (len(token) > 1) and (token[-1] in 'yY') and token[:-1].isdecimal()
+
+
+def is_salary(token: str) -> bool:
+    # A whole number of dollars, or a k/m suffixed amount which may have decimals; a bare 1.5 is a typo, not a salary
+    if token.isdecimal():
+        return True
+    number = token[:-1] if token[-1:] in 'kKmM' else ''
+    return (len(number) > 0) and number.replace('.', '', 1).isdecimal()
+
+
+def parse_contracts(lines: Iterable[str], entry_level: bool = False, salaries_min: pd.Series = None,
+                    extend=False, filename: str = None) -> Dict[str, Contract]:
+    # salaries_min, as from read_salaries_min, raises contracts without a salary to each player's minimum
+    parsed = tokenize_contracts(lines, entry_level=entry_level, extend=extend, filename=filename)
+    if entry_level:
+        return {name: None for name in parsed.names}
+    missing = parsed.salaries < 0
+    salaries = np.where(missing, get_salary_min_array(parsed.years), parsed.salaries)
+    if salaries_min is not None and np.any(missing):
+        names_missing = [name for name, is_missing in zip(parsed.names, missing) if is_missing]
+        sheet = salaries_min.reindex(names_missing)
+        if sheet.isna().any():
+            raise KeyError(f"Players {list(sheet.index[sheet.isna()])} have no minimum salary in salaries_min")
+        salaries[missing] = np.minimum(np.maximum(sheet.to_numpy(dtype=np.int64), salaries[missing]),
+                                       salary_max_league)
+    by_id = {team.value: team for team in teams.registry.Team}
+    contracts = {}
+    for name_full, salary, years, id_team in zip(parsed.names, salaries.tolist(), parsed.years.tolist(),
+                                                 parsed.teams.tolist()):
+        contracts[name_full] = Contract(salary=salary, years=years, team=by_id[id_team] if id_team >= 0 else None)
+    return contracts
+
+
 def parse_length(string: str) -> int:
-    string = string.lower()
-    if string[-1] != 'y':
+    if not is_length(string):
         raise RuntimeError(f"Can't parse {string=} as contract length")
     return int(string[:-1])
 
 
 # not parsley_celery
 def parse_salary(salary: str) -> int:
-    salary_orig = salary
-    salary = salary.lower()
-    last = salary[-1]
-    is_letter = last.isalpha()
-    salary = Decimal(salary[:-1] if is_letter else salary)
-    if is_letter:
-        if last == 'm':
-            salary *= 1000000
-        elif last == 'k':
-            salary *= 1000
-        else:
-            raise RuntimeError(f"Unrecognized suffix char={last} in salary={salary_orig}")
-    return salary
+    # Exact integer arithmetic on the digits, so 1.25m is 1250000 with no float or Decimal rounding
+    if salary.isdecimal():
+        return int(salary)
+    if not is_salary(salary):
+        raise RuntimeError(f"Can't parse {salary=} as salary")
+    multiplier = salary_multipliers.get(salary[-1].lower(), 1)
+    whole, _, fraction = (salary[:-1] if multiplier > 1 else salary).partition('.')
+    fraction = fraction.rstrip('0')
+    n_places = len(str(multiplier)) - 1
+    if len(fraction) > n_places:
+        raise RuntimeError(f"Salary={salary} is not a whole number of dollars")
+    return int(whole or '0')*multiplier + (int(fraction.ljust(n_places, '0')) if fraction else 0)
+
+
+def raise_token_error(line: str, tokens: List[str], idx: int, number: int, expected: str, filename: str = None):
+    source = f' in {filename}' if filename is not None else ''
+    raise RuntimeError(f"Expected {expected} but got {tokens[idx]!r}{source} on line {number},"
+                       f" column {get_column(line, tokens, idx)}: {line.strip()}")
 
 
 def read_contracts(filename: str, entry_level: bool = False, encoding=encoding_default,
-                   salaries_min: Dict[str, int] = None, extend=False):
-    contracts = {}
+                   salaries_min: pd.Series = None, extend=False):
     with open(filename, 'r', encoding=encoding) as file:
-        has_min = salaries_min is not None
-        for line in file:
-            if entry_level:
-                contracts[line.strip()] = None
-            else:
-                data = line.strip()
-                team = None
-                if data:
-                    data = data.rsplit(' ', 1)
-                    try:
-                        if not extend:
-                            team = teams.Team(int(data[1]))
-                            data = data[0].rsplit(' ', 1)
-                        years = parse_length(data[1])
-                        try:
-                            data = data[0].rsplit(' ', 1)
-                            salary = parse_salary(data[1])
-                            check_min = False
-                        except RuntimeError:
-                            salary = get_salary_min(years)
-                            check_min = has_min
-                    except RuntimeError:
-                        salary = parse_salary(data[1])
-                        data = data[0].rsplit(' ', 1)
-                        years = parse_length(data[1])
-                        check_min = False
-
-                    name_full = data[0]
-                    if check_min:
-                        salary_min = salaries_min[name_full]
-                        salary = min(max(salary_min, salary), salary_max_league)
-                    contracts[name_full] = Contract(salary=salary, years=years, team=team)
-    return contracts
-
-
-def read_salaries_min(filename: str, encoding=encoding_default):
-    tab = pd.read_csv(filename, encoding=encoding)
-    salaries = [1000000*Decimal(x) for x in tab['UFA']*tab['UFA?'] + tab['RFA']*~tab['UFA?']]
-    names = tab['NAME']
-    return {name: salary for name, salary in zip(names, salaries)}
+        return parse_contracts(file, entry_level=entry_level, salaries_min=salaries_min, extend=extend,
+                               filename=filename)
+
+
+def read_salaries_min(filename: str, encoding=encoding_default) -> pd.Series:
+    # Minimum salaries in dollars by player name, from the UFA or RFA column (in millions) per the UFA? column
+    path = os.path.abspath(filename)
+    key = (path, os.path.getmtime(filename))
+    salaries = salaries_min_cache.get(key)
+    if salaries is None:
+        tab = pd.read_csv(filename, encoding=encoding)
+        millions = np.where(tab['UFA?'].to_numpy(dtype=bool), tab['UFA'].to_numpy(), tab['RFA'].to_numpy())
+        salaries = pd.Series(np.rint(1000000*millions).astype(np.int64), index=tab['NAME'].to_numpy(),
+                             name='salary_min')
+        salaries = salaries[~salaries.index.duplicated(keep='last')]
+        for key_old in [key_old for key_old in salaries_min_cache if key_old[0] == path]:
+            del salaries_min_cache[key_old]
+        salaries_min_cache[key] = salaries
+    return salaries
+
+
+def round_salaries(salaries, round_num: int = None) -> np.ndarray:
+    if round_num is None:
+        round_num = salary_round
+    return round_num*np.round(np.asarray(salaries)/round_num).astype(np.int64)
 
 
 def round_salary(salary: float, round_num: int = None) -> int:
-    if round_num is None:
-        round_num = salary_round
-    return round_num * int(round(salary/round_num))
+    return int(round_salaries(salary, round_num=round_num))
 
 
 def sign_qualifiers(players: plyr.Players, filename: str, encoding=encoding_default):
-    found = set()
-    to_sign = defaultdict(list)
+    acronyms, names = [], []
     with open(filename, encoding=encoding) as f:
         for line in f:
             team, name = line.strip().split(' - ')
-            if name in found:
-                raise RuntimeError(f'Duplicate qualified RFA fonud: {name}')
-            pid = players.find_player_by_fullname(name)
-            player = players.get_player(pid)
-            if player.years != 0 or player.rights != teams.Team.UFA:
-                raise RuntimeError(f'Player {player} is not listed UFA and cannot sign qualifying offer')
-            to_sign[team].append((pid, player))
-    for name_team, players_team in to_sign.items():
-        team = teams.Team[name_team]
-        for (pid, player) in players_team:
-            player.rights = team
-            player.team = team
-            player.years = 1
-            player.salary = round_salary(1.2*player.salary)
-            print(f"Signing {player} ({team.name}) qualifying offer at player.salary={player.salary}")
+            acronyms.append(team)
+            names.append(name)
+    duplicated = pd.Index(names).duplicated()
+    if np.any(duplicated):
+        raise RuntimeError(f'Duplicate qualified RFA found: {names[np.argmax(duplicated)]}')
+    rows, matched = players.find_players_by_fullnames(names)
+    for name, row in matched.items():
+        print(players.describe_matched(name, row))
+    if np.any(rows < 0):
+        name = names[np.argmax(rows < 0)]
+        raise NameError(f"No player named {', '.join(reversed(plyr.get_names(name)))}"
+                        f"{players.describe_suggestions(name)}")
+    tab = players.table
+    ineligible = (tab.years.to_numpy()[rows] != 0) | (tab.rights.to_numpy()[rows] != teams.Team.UFA.value)
+    if np.any(ineligible):
+        raise RuntimeError(f'Player {players.get_player(rows[np.argmax(ineligible)])} is not listed UFA and cannot sign'
+                           f' qualifying offer')
+    ids_team = np.array([teams.Team[acronym].value for acronym in acronyms], dtype=np.int64)
+    # Signed team by team, in the order each team first appears
+    order = np.argsort(pd.factorize(ids_team)[0], kind='stable')
+    rows, ids_team = rows[order], ids_team[order]
+    for column, values in (('rights', ids_team), ('team', ids_team), ('years', 1),
+                           ('salary', round_salaries(1.2*tab.salary.to_numpy()[rows]))):
+        players.set_values(rows, column, values)
+    for row in rows:
+        player = players.get_player(row)
+        print(f"Signing {player} ({player.team.name}) qualifying offer at player.salary={player.salary}")
 
 
 def slide_contracts(players: plyr.Players, filename: str, filename_ineligible: str = None, year_draft_max=None,
                     encoding="UTF-8"):
     with open(filename, encoding=encoding) as f:
-        sliders = set(f.read().splitlines())
+        sliders = list(dict.fromkeys(f.read().splitlines()))
     if filename_ineligible:
         with open(filename_ineligible, encoding=encoding) as f:
             sliders_no = set(f.read().splitlines())
@@ -323,28 +343,49 @@ def slide_contracts(players: plyr.Players, filename: str, filename_ineligible: s
     warnings = []
     results = []
     resignings = {}
-    for name_full in (name for name in sliders if name and (name not in sliders_no)):
-        try:
-            pid = players.find_player_by_fullname(name_full)
-            player = players.get_player(pid)
-            errmsgs = []
-            if not 2 <= player.years <= 3:
-                errmsgs.append(f"Player {name_full} can't slide contract unless 2 <= players.years={players.years} <= 3"
-                               f"(either unsigned or not first two years of ELC)")
-            elc = get_elc(player, year_draft_max=year_draft_max, check_contract=False)
-            if elc.salary != player.salary:
-                errmsgs.append(f"Player {name_full} slide contract salary={player.salary} != elc.salary={elc.salary}"
-                               f"; player appears not to be on ELC")
-            if errmsgs:
-                raise ValueError(f"Player {name_full} {' and '.join(errmsgs)}")
-            player.years += 1
+    names = [name for name in sliders if name and (name not in sliders_no)]
+    rows, matched = players.find_players_by_fullnames(names)
+    warnings.extend(players.describe_matched(name, row) for name, row in matched.items())
+    found = rows >= 0
+    tab = players.table
+    years, salaries = tab.years.to_numpy()[rows], tab.salary.to_numpy()[rows]
+    draft_years, draft_overalls = tab.draft_year.to_numpy()[rows], tab.draft_overall.to_numpy()[rows]
+    # The same checks as get_elc(check_contract=False), in the same order
+    undrafted = ~(draft_overalls > 0)
+    boosters = np.zeros(len(rows), dtype=bool)
+    if year_draft_max is not None:
+        ages = ((pd.Timestamp(f'{year_draft_max + 1}-09-16') - players.get_birthdates()).dt.days/365.25).to_numpy()
+        boosters = ((tab.pot < 70) & (tab.con >= 75)).to_numpy()[rows] & (ages[rows] < 19)
+    invalid_years = ~((years >= 2) & (years <= 3))
+    elc_salaries = get_elc_salaries(draft_years, draft_overalls)
+    not_elc = elc_salaries != salaries
+    valid = found & ~undrafted & ~boosters & ~invalid_years & ~not_elc
+    players.set_values(rows[valid], 'years', years[valid] + 1)
+    for idx, name_full in enumerate(names):
+        if not found[idx]:
+            errors.append(players.describe_unfound(name_full))
+            continue
+        player = players.get_player(rows[idx])
+        if valid[idx]:
             results.append(f"Player {name_full} ({player.rights.name}) contract sliding to:"
                            f" {player.years}y {player.salary}")
             resignings[name_full] = player
-        except NameError:
-            errors.append(f"Couldn't find player: {name_full} ({plyr.get_names(name_full)})")
-        except Exception as error:
-            errors.append(f"Player {name_full} ({player.rights.name}) got error: {error}")
+            continue
+        if undrafted[idx]:
+            error = f"Can't get ELC for undrafted player: {player} with draft_overall={player.draft_overall}"
+        elif boosters[idx]:
+            error = (f"Player: {player} is_booster and is_just_drafted from draft year={player.draft_year} "
+                     f"> year_draft_max={year_draft_max}")
+        else:
+            errmsgs = []
+            if invalid_years[idx]:
+                errmsgs.append(f"Player {name_full} can't slide contract unless 2 <= player.years={player.years} <= 3"
+                               f"(either unsigned or not first two years of ELC)")
+            if not_elc[idx]:
+                errmsgs.append(f"Player {name_full} slide contract salary={player.salary} != elc.salary="
+                               f"{elc_salaries[idx]}; player appears not to be on ELC")
+            error = f"Player {name_full} {' and '.join(errmsgs)}"
+        errors.append(f"Player {name_full} ({player.rights.name}) got error: {error}")
 
     return errors, warnings, results, resignings
 
@@ -364,3 +405,120 @@ def summarize(players: Dict[str, plyr.Player]):
             f" ({salaries_next/1000000:.3f}M next season)"
         )
         print(msg)
+
+
+def tokenize_contracts(lines: Iterable[str], entry_level: bool = False, extend: bool = False,
+                       filename: str = None) -> ContractLines:
+    # Grammar, for each non-blank line:
+    # ELCs: <name>
+    # extensions: <name> <terms>
+    # signings: <name> <terms> <team id>
+    # where <terms> is <N>y, <salary> <N>y or <N>y <salary>, and a salary is digits with an optional k/m suffix
+    names, salaries, years, ids_team, numbers = [], [], [], [], []
+    # Tokens are classified once per file; contract terms and team ids repeat on most lines
+    by_token = {str(team.value): team.value for team in teams.registry.Team}
+    terms = {}
+    for number, line in enumerate(lines, start=1):
+        if entry_level:
+            name_full = line.strip()
+            if name_full:
+                names.append(name_full)
+                numbers.append(number)
+            continue
+        tokens = line.split()
+        if not tokens:
+            continue
+        end = len(tokens)
+        id_team = -1
+        if not extend:
+            end -= 1
+            token = tokens[end]
+            id_team = by_token.get(token)
+            if id_team is None:
+                if not (token.isdecimal() and int(token) in by_token.values()):
+                    raise_token_error(line, tokens, end, number, 'team id', filename)
+                id_team = by_token[token] = int(token)
+        idx_length, length, salary = None, None, -1
+        while end > 1:
+            token = tokens[end - 1]
+            term = terms.get(token)
+            if term is None:
+                if is_length(token):
+                    term = (True, int(token[:-1]))
+                elif is_salary(token):
+                    try:
+                        term = (False, parse_salary(token))
+                    except RuntimeError as error:
+                        raise_token_error(line, tokens, end - 1, number, f'salary ({error})', filename)
+                else:
+                    term = ()
+                terms[token] = term
+            if term and term[0] and length is None:
+                idx_length, length = end - 1, term[1]
+            elif term and not term[0] and salary < 0:
+                salary = term[1]
+            elif term:
+                raise_token_error(line, tokens, end - 1, number, 'player name before a single length and salary',
+                                  filename)
+            else:
+                break
+            end -= 1
+        if length is None:
+            raise_token_error(line, tokens, max(end - 1, 0), number, 'contract length as <N>y', filename)
+        if not length > 0:
+            raise_token_error(line, tokens, idx_length, number, 'contract length of at least 1y', filename)
+        names.append(' '.join(tokens[:end]))
+        salaries.append(salary)
+        years.append(length)
+        ids_team.append(id_team)
+        numbers.append(number)
+    return ContractLines(
+        names=names,
+        salaries=np.array(salaries, dtype=np.int64),
+        years=np.array(years, dtype=np.int64),
+        teams=np.array(ids_team, dtype=np.int64),
+        line_numbers=np.array(numbers, dtype=np.int64),
+    )
+
+
+def validate_contracts(players: plyr.Players, years_extra: int = 0) -> pd.DataFrame:
+    # Checks every contract in the league at once; years_extra allows for offseason extensions before rollover
+    # Sheet minimums, if joined onto players, apply to this offseason's extensions as in enter_contracts, which only
+    # stand out from expiring contracts before rollover: more than years_extra years, not ELCs and not free agents
+    tab = players.table
+    salary, years = tab.salary.to_numpy(), tab.years.to_numpy()
+    team, rights = tab.team.to_numpy(), tab.rights.to_numpy()
+    registry = teams.registry
+    unsigned = salary == salary_unsigned
+    signed = (years > 0) & ~unsigned
+    is_elc = (salary == get_elc_salaries(tab.draft_year.to_numpy(), tab.draft_overall.to_numpy())) & (
+        tab.draft_overall.to_numpy() > 0)
+    years_max = get_max_years_array(salary) + years_extra
+    salary_min = get_salary_min_array(years - years_extra)
+    in_league = registry.is_nhl(team) | registry.is_farm(team)
+    rules = (
+        ('salary_min_league', signed & (salary < salary_min_league), salary_min_league),
+        ('salary_max_league', signed & (salary > salary_max_league), salary_max_league),
+        ('years_max_league', years > years_max_league + years_extra, years_max_league + years_extra),
+        ('years_max', signed & ~is_elc & (years > years_max), years_max),
+        ('salary_min', signed & ~is_elc & (salary < salary_min), salary_min),
+        ('unsigned_years', unsigned & (years > 1), 1),
+        ('rights_farm', registry.is_farm(rights), registry.get_parent_ids(rights)),
+        ('team_rights', in_league & (registry.get_parent_ids(team) != rights), rights),
+    )
+    if players.salaries_min is not None and years_extra > 0:
+        salary_min_sheet = np.minimum(players.salaries_min, salary_max_league)
+        resigned = signed & ~is_elc & (years > years_extra) & (tab.acquired.to_numpy() != "signed as a free agent")
+        rules += (('salary_min_sheet', resigned & (salary < salary_min_sheet), salary_min_sheet),)
+    violations = []
+    for rule, invalid, limit in rules:
+        rows = np.flatnonzero(invalid)
+        violations.append(pd.DataFrame({
+            'row': rows,
+            'rule': rule,
+            'limit': np.broadcast_to(limit, invalid.shape)[rows],
+        }))
+    violations = pd.concat(violations, ignore_index=True)
+    details = tab[['name_first', 'name_last', 'salary', 'years', 'team', 'rights']].iloc[violations.row]
+    return pd.concat([violations, details.reset_index(drop=True)], axis=1).sort_values('row', kind='stable',
+                                                                                    ignore_index=True)
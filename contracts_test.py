@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+import contracts as cntr
+
+
+@pytest.mark.parametrize('token, expected', [
+    ('750000', 750000), ('750k', 750000), ('750K', 750000), ('1.5m', 1500000), ('1.25M', 1250000), ('.5m', 500000),
+])
+def test_parse_salary(token, expected):
+    assert cntr.is_salary(token)
+    assert cntr.parse_salary(token) == expected
+
+
+@pytest.mark.parametrize('token', ['1.5', '0.75', 'm', 'k', '1.2.3m', '1,5m', '$1.5m', '3y', ''])
+def test_is_salary_rejects(token):
+    assert not cntr.is_salary(token)
+    with pytest.raises(RuntimeError):
+        cntr.parse_salary(token)
+
+
+def test_tokenize_extensions():
+    lines = ['Joe Smith 1.5m 3y\n', '\n', 'Jane Doe 2y 750k\n', 'Al Bo 3y\n', 'Cy Di 750000 2y\n']
+    parsed = cntr.tokenize_contracts(lines, extend=True)
+    assert parsed.names == ['Joe Smith', 'Jane Doe', 'Al Bo', 'Cy Di']
+    assert parsed.salaries.tolist() == [1500000, 750000, -1, 750000]
+    assert parsed.years.tolist() == [3, 2, 3, 2]
+    assert parsed.teams.tolist() == [-1, -1, -1, -1]
+    assert parsed.line_numbers.tolist() == [1, 3, 4, 5]
+
+
+def test_tokenize_signings(registry):
+    parsed = cntr.tokenize_contracts(['Joe Smith 1.5m 3y 2\n', 'Jane Doe 1y 600k 4\n'])
+    assert parsed.names == ['Joe Smith', 'Jane Doe']
+    assert parsed.salaries.tolist() == [1500000, 600000]
+    assert parsed.years.tolist() == [3, 1]
+    assert parsed.teams.tolist() == [2, 4]
+
+
+def test_tokenize_bare_decimal_is_not_a_salary():
+    parsed = cntr.tokenize_contracts(['Joe Smith 1.5 3y\n'], extend=True)
+    assert parsed.names == ['Joe Smith 1.5']
+    assert parsed.salaries.tolist() == [-1]
+
+
+@pytest.mark.parametrize('line, extend, expected', [
+    ('Joe Smith 3y 1.5m 1.2m', True, "Expected player name before a single length and salary but got '1.5m'"
+                                     " on line 2, column 14"),
+    ('Joe Smith 1.5m', True, "Expected contract length as <N>y but got 'Smith' on line 2, column 5"),
+    ('Joe  0y', True, "Expected contract length of at least 1y but got '0y' on line 2, column 6"),
+    ('Joe 1.2345678m 2y', True, "Expected salary (Salary=1.2345678m is not a whole number of dollars) but got"
+                                " '1.2345678m' on line 2, column 5"),
+    ('Joe Smith 1.5m 3y XYZ', False, "Expected team id but got 'XYZ' on line 2, column 19"),
+    ('Joe Smith 1.5m 3y 9', False, "Expected team id but got '9' on line 2, column 19"),
+])
+def test_tokenize_errors(registry, line, extend, expected):
+    with pytest.raises(RuntimeError) as error:
+        cntr.tokenize_contracts(['Al Bo 1y\n' if extend else 'Al Bo 1y 1\n', f'{line}\n'], extend=extend)
+    assert expected in str(error.value)
+
+
+def test_parse_contracts_salaries_min(registry):
+    contracts = cntr.parse_contracts(['Joe Smith 3y\n', 'Jane Doe 2y 900k\n'], extend=True,
+                                     salaries_min=pd.Series({'Joe Smith': 1500000}))
+    assert (contracts['Joe Smith'].salary, contracts['Joe Smith'].years) == (1500000, 3)
+    assert (contracts['Jane Doe'].salary, contracts['Jane Doe'].years) == (900000, 2)
+    assert all(contract.team is None for contract in contracts.values())
+    assert type(contracts['Joe Smith'].salary) is int
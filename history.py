@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import argparse
+import numpy as np
+import os
+from typing import Iterable, List
+
+import columnar
+import lazy
+import players as plyr
+
+pd = lazy.load('pandas')
+
+# Draft info changes when a player is drafted between seasons, so snapshots are keyed as Players.align's fallback
+columns_key = plyr.columns_identity_fallback
+columns_contract = ('salary', 'years', 'rights', 'team')
+columns_ratings = plyr.names_columns[0] + plyr.names_columns[1][:6]
+extension = 'parquet'
+
+
+def get_keys(table: pd.DataFrame) -> np.ndarray:
+    # Row indices shift between saves (drafts, imports, deletions); name and birthdate don't
+    return plyr.get_identity_keys(table, columns_key)
+
+
+class History:
+    columns: List[str] = None
+    path: str = None
+    table: pd.DataFrame = None
+
+    def append(self, players: plyr.Players, label: str):
+        labels = self.labels
+        if label in labels:
+            raise ValueError(f'History {self.path} already has snapshot label={label}')
+        if os.sep in label or '/' in label:
+            raise ValueError(f'Snapshot label={label} must not contain path separators')
+        filename = os.path.join(self.path, f'{len(labels):04d}_{label}.{extension}')
+        players.write_columnar(filename)
+        snapshot = self._read(filename, label, len(labels))
+        self.table = pd.concat([self.table, snapshot], ignore_index=True) if labels else snapshot
+
+    def boosts(self, threshold: int = 1) -> pd.DataFrame:
+        changes = self.changes('pot')
+        return changes[changes.change >= threshold]
+
+    def busts(self, threshold: int = 1) -> pd.DataFrame:
+        changes = self.changes('pot')
+        return changes[changes.change <= -threshold]
+
+    def changes(self, column: str) -> pd.DataFrame:
+        # Changes between consecutive snapshots for every player present in both, in long format
+        values = self.series(column)
+        labels = values.columns
+        before, after = values.to_numpy()[:, :-1], values.to_numpy()[:, 1:]
+        present = ~(np.isnan(before) | np.isnan(after))
+        rows, cols = np.nonzero(present)
+        return pd.DataFrame({
+            'key': values.index[rows],
+            'snapshot_before': labels[cols],
+            'snapshot': labels[cols + 1],
+            'before': before[rows, cols],
+            'after': after[rows, cols],
+            'change': after[rows, cols] - before[rows, cols],
+        })
+
+    def contracts(self, keys: Iterable[int] = None) -> pd.DataFrame:
+        tab = self.table
+        if keys is not None:
+            tab = tab[tab.key.isin(list(keys))]
+        return tab[['key', 'snapshot', 'order'] + list(columns_contract)].sort_values(['key', 'order'])
+
+    def development(self, columns: Iterable[str] = columns_ratings) -> pd.DataFrame:
+        # Rating changes from each player's first snapshot to their last
+        tab = self.table.sort_values('order')
+        grouped = tab.groupby('key', sort=False)[list(columns)]
+        return grouped.last() - grouped.first()
+
+    @property
+    def labels(self) -> List[str]:
+        if self.table is None or len(self.table) == 0:
+            return []
+        return list(self.table.drop_duplicates('order').sort_values('order').snapshot)
+
+    def series(self, column: str) -> pd.DataFrame:
+        # One row per player key, one column per snapshot in order; NaN where the player is absent
+        tab = self.table.drop_duplicates(['key', 'order'])
+        values = tab.pivot(index='key', columns='order', values=column).astype(float)
+        values.columns = pd.Index(self.labels)[values.columns.to_numpy()]
+        return values
+
+    def _read(self, filename: str, label: str, order: int) -> pd.DataFrame:
+        columns = None if self.columns is None else list(dict.fromkeys(self.columns + list(columns_key)))
+        tab = columnar.read(filename, plyr.Players.dtypes(), columns=columns)
+        keys = get_keys(tab)
+        n_dupes = np.sum(pd.Index(keys).duplicated())
+        if n_dupes > 0:
+            print(f'Warning; snapshot {label} has {n_dupes} players with duplicate name and birthdate keys')
+        return pd.concat([tab, pd.DataFrame({'key': keys, 'snapshot': label, 'order': order}, index=tab.index)], axis=1)
+
+    def __init__(self, path: str, columns: Iterable[str] = None):
+        self.path = path
+        self.columns = None if columns is None else list(columns)
+        os.makedirs(path, exist_ok=True)
+        filenames = sorted(name for name in os.listdir(path) if name.endswith(f'.{extension}'))
+        tables = []
+        for order, name in enumerate(filenames):
+            prefix, label = name[:-len(extension) - 1].split('_', 1)
+            if int(prefix) != order:
+                raise RuntimeError(f'History {path} snapshot file {name} out of sequence; expected prefix {order:04d}')
+            tables.append(self._read(os.path.join(path, name), label, order))
+        self.table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(
+            columns=list(plyr.Players.dtypes()) + ['key', 'snapshot', 'order'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Add a players save to a season-over-season history store")
+    parser.add_argument('--history', required=True, type=str, help='History store directory')
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--label', required=True, type=str, help='Snapshot label, e.g. the season')
+    args = parser.parse_args()
+
+    history = History(args.history)
+    history.append(plyr.Players(args.players), args.label)
+    print(f"History {args.history} now has snapshots: {history.labels}")
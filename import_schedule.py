@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 import numpy as np
 
 import teams
-from teams import read_teams, N_TEAMS
+from teams import read_teams
 import schedule as sched
 
 format_date = ""
@@ -38,12 +38,12 @@ if __name__ == '__main__':
             team1, team2 = mapping.split(':')
             team_mapping[team1] = team2
 
-    read_teams(args.config_teams)
+    registry = read_teams(args.config_teams)
 
     schedule = sched.Schedule(args.schedule_in)
     tab = schedule.table
 
-    n_expected = (sched.N_GAMES_REG*N_TEAMS)//2
+    n_expected = (sched.N_GAMES_REG*registry.n_teams)//2
     n_games = len(tab)
     if n_games != n_expected:
         raise RuntimeError(f'Imported schedule_in={args.schedule_in} has n_games={n_games} != n_expected={n_expected}')
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import numpy as np
+from typing import List
+
+import lazy
+
+pd = lazy.load('pandas')
+
+
+class Journal:
+    # Each entry is one column's change to a set of rows, stored as parallel arrays
+    columns: List[str] = None
+    rows: List[np.ndarray] = None
+    old: List[np.ndarray] = None
+    new: List[np.ndarray] = None
+
+    @staticmethod
+    def read(filename: str) -> Journal:
+        journal = Journal()
+        with open(filename, encoding='UTF-8') as file:
+            for idx, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    journal.record(entry['column'], np.array(entry['rows'], dtype=np.int64), np.array(entry['old']),
+                                   np.array(entry['new']))
+                except (KeyError, ValueError) as err:
+                    raise RuntimeError(f"Can't parse journal entry from {filename} on line number {idx}: {err}")
+        return journal
+
+    def changes(self, since: int = 0) -> pd.DataFrame:
+        entries = range(since, len(self.rows))
+        return pd.DataFrame({
+            'row': np.concatenate([self.rows[idx] for idx in entries] or [np.zeros(0, dtype=np.int64)]),
+            'column': np.concatenate([np.full(len(self.rows[idx]), self.columns[idx], dtype=object)
+                                      for idx in entries] or [np.zeros(0, dtype=object)]),
+            'old': np.concatenate([self.old[idx].astype(object) for idx in entries] or [np.zeros(0, dtype=object)]),
+            'new': np.concatenate([self.new[idx].astype(object) for idx in entries] or [np.zeros(0, dtype=object)]),
+        })
+
+    def record(self, column: str, rows: np.ndarray, old: np.ndarray, new: np.ndarray):
+        if len(rows) > 0:
+            self.columns.append(column)
+            self.rows.append(rows)
+            self.old.append(old)
+            self.new.append(new)
+
+    def replay(self, table: pd.DataFrame, since: int = 0):
+        for idx in range(since, len(self.rows)):
+            table.iloc[self.rows[idx], table.columns.get_loc(self.columns[idx])] = self.new[idx]
+
+    def rollback(self, table: pd.DataFrame, savepoint: int = 0):
+        for idx in reversed(range(savepoint, len(self.rows))):
+            table.iloc[self.rows[idx], table.columns.get_loc(self.columns[idx])] = self.old[idx]
+        del self.columns[savepoint:], self.rows[savepoint:], self.old[savepoint:], self.new[savepoint:]
+
+    def rows_changed(self, since: int = 0) -> np.ndarray:
+        return np.unique(np.concatenate(self.rows[since:] or [np.zeros(0, dtype=np.int64)]))
+
+    def savepoint(self) -> int:
+        return len(self.rows)
+
+    def write(self, filename: str, since: int = 0):
+        with open(filename, 'w', encoding='UTF-8') as file:
+            for idx in range(since, len(self.rows)):
+                entry = {'column': self.columns[idx], 'rows': self.rows[idx].tolist(), 'old': self.old[idx].tolist(),
+                         'new': self.new[idx].tolist()}
+                file.write(f'{json.dumps(entry)}\n')
+
+    @property
+    def n_values(self) -> int:
+        return sum(len(rows) for rows in self.rows)
+
+    def __len__(self):
+        # Entries, as savepoint() and since= count them
+        return len(self.rows)
+
+    def __init__(self):
+        self.columns = []
+        self.rows = []
+        self.old = []
+        self.new = []
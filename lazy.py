@@ -0,0 +1,21 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def load(name: str) -> ModuleType:
+    # Registers the module now but only runs its code on first attribute access, so importing a module that needs
+    # pandas somewhere doesn't cost a CLI that never gets there. Annotations naming the module's types must be
+    # deferred with "from __future__ import annotations" or they count as an access
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,10 +1,17 @@
 import argparse
 import contracts as cntr
 from datetime import datetime
+import numpy as np
+import pipeline as ppln
 import players as plyr
+import profiling
 import teams
 
-if __name__ == '__main__':
+pipeline = ppln.Pipeline()
+columns_contract = ('salary', 'years', 'team', 'rights', 'acquired')
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Process EHM files")
     parser.add_argument('--players', default='C:/Games/EHM/saves/EHEC/players.ehm')
     parser.add_argument('--compare_players', default=None, type=str)
@@ -14,151 +21,267 @@ if __name__ == '__main__':
     parser.add_argument('--draft_year_last', default=None, type=int)
     parser.add_argument('--elcs', default=None, type=str)
     parser.add_argument('--extensions', default=None, type=str)
+    parser.add_argument('--journal', default=None, type=str, help='Path to write the log of changed values to')
     parser.add_argument('--junior_birthdate', default=None, type=str)
+    parser.add_argument('--name_threshold', default=None, type=float,
+                        help='Accept the best fuzzy match scoring at least this (0-1) for names not found exactly')
     parser.add_argument('--output', default=None, type=str)
+    parser.add_argument('--profile', default=None, type=str, help='Path to write a JSON profiling report to')
+    parser.add_argument('--profile_cprofile', action='store_true', help='Include cProfile stats in the report')
+    parser.add_argument('--profile_memory', action='store_true', help='Include tracemalloc stats in the report')
     parser.add_argument('--qualified_rfas', default=None, type=str)
     parser.add_argument('--release_rights_date', default=None, type=str)
     parser.add_argument('--replace_vopatizers', action='store_true')
     parser.add_argument('--reset_invalid_salaries', action='store_true')
     parser.add_argument('--retire_players', action='store_true')
     parser.add_argument('--return_juniors', default=None, type=str)
+    parser.add_argument('--rollback_failed_contracts', action='store_true',
+                        help='Undo a whole contracts file (ELCs, extensions or signings) if any of its entries fail')
     parser.add_argument('--salaries_min', default=None, type=str)
     parser.add_argument('--signings', default=None, type=str)
     parser.add_argument('--skip_reset_low_fighting', action='store_true')
     parser.add_argument('--slide_eligible', default=None, type=str)
     parser.add_argument('--slide_ineligible', default=None, type=str)
     parser.add_argument('--unretire', action='store_true')
+    parser.add_argument('--validate_contracts', default=None, type=str,
+                        help='Check every contract against the league rules and write violations to this csv')
+    parser.add_argument('--validate_years_extra', default=0, type=int,
+                        help='Extra contract years to allow for offseason extensions before rollover; if positive,'
+                             ' extensions are also checked against --salaries_min')
     group = parser.add_mutually_exclusive_group()
-    parser.add_argument('--invite_prospects', action='store_true')
-    parser.add_argument('--return_prospects', action='store_true')
+    group.add_argument('--invite_prospects', action='store_true')
+    group.add_argument('--return_prospects', action='store_true')
+    return parser.parse_args(argv)
 
-    args = parser.parse_args()
-    teams.read_teams(args.config_teams)
 
-    date_junior = (datetime.strptime(args.junior_birthdate, args.date_format) if args.junior_birthdate is not None
-                   else None)
+@pipeline.stage('retire', reads=('status', 'years') + ppln.columns_birthdate + ppln.columns_overall,
+                writes=('status',), vectorized=True, when=lambda args: args.retire_players)
+def retire_players(ctx: ppln.Context):
+    date = datetime(year=datetime.today().year, month=9, day=16)
+    retirees = ctx.players.find_retirees(date=date, print_summary=True, ages=ctx.ages_years(date),
+                                         overalls=ctx.overall())
+    return {'status': (retirees, 1)}
 
-    players = plyr.Players(args.players)
-    tab = players.table
-    
-    if args.retire_players:
-        retirees = players.find_retirees(print_summary=True)
-        tab.loc[retirees, ['status']] = 1
-
-    if args.unretire:
-        tab.loc[tab.loc[:, 'status'] == 1, ['status']] = 0
-
-    salaries_min = cntr.read_salaries_min(args.salaries_min) if args.salaries_min is not None else None
-
-    errors_all, warnings_all, results_all, resignings_all = [], [], [], {}
-    for file_contract, entry_level, extend in (
-            (args.elcs, True, False), (args.extensions, False, True), (args.signings, False, False),
-    ):
-        if file_contract is not None:
-            contracts = cntr.read_contracts(
-                file_contract,
-                entry_level=entry_level,
-                salaries_min=salaries_min if not entry_level else None,
-                extend=extend,
-            )
-            errors, warnings, results, resignings = cntr.enter_contracts(
-                players,
-                contracts=contracts,
-                salaries_min=salaries_min,
-                year_draft_max=args.draft_year_last if entry_level else None,
-            )
-            for msgs_all, msgs_new in ((errors_all, errors), (warnings_all, warnings), (results_all, results)):
-                msgs_all.extend(msgs_new)
-            resignings_all.update(resignings)
-
-    if args.slide_eligible:
-        errors, warnings, results, resignings = cntr.slide_contracts(
-            players, args.slide_eligible, args.slide_ineligible,
-        )
-        for msgs_all, msgs_new in ((errors_all, errors), (warnings_all, warnings), (results_all, results)):
-            msgs_all.extend(msgs_new)
-
-    if args.draft_year_last:
-        for player in [players.get_player(pid) for pid in range(players.n_players)]:
-            if player.is_booster and (player.years == 0) and not player.is_just_drafted(args.draft_year_last + 1) \
-                    and (player.age(datetime.fromisoformat(f'{args.draft_year_last + 1}-09-16')) < 20):
-                warnings_all.append(f'Pot booster {player} still unsigned')
-
-    if warnings_all:
+
+@pipeline.stage('unretire', reads=('status',), writes=('status',), vectorized=True,
+                when=lambda args: args.unretire)
+def unretire_players(ctx: ppln.Context):
+    return {'status': (ctx.players.table.status == 1, 0)}
+
+
+def enter_contracts(ctx: ppln.Context, file_contract: str, entry_level: bool, extend: bool, lines=None):
+    # lines, if given, are entries from file_contract to enter instead of the whole file
+    args = ctx.args
+    kwargs = dict(entry_level=entry_level, salaries_min=ctx.salaries_min if not entry_level else None, extend=extend)
+    contracts = cntr.read_contracts(file_contract, **kwargs) if lines is None else cntr.parse_contracts(
+        lines, filename=file_contract, **kwargs)
+    savepoint = ctx.players.savepoint()
+    errors, warnings, results, resignings = cntr.enter_contracts(
+        ctx.players,
+        contracts=contracts,
+        year_draft_max=args.draft_year_last if entry_level else None,
+    )
+    if errors and args.rollback_failed_contracts:
+        ctx.players.rollback(savepoint)
+        warnings.append(f"Rolled back all {len(contracts)} contracts from {file_contract} after {len(errors)} errors")
+        results, resignings = [], {}
+    for msgs_all, msgs_new in ((ctx.errors, errors), (ctx.warnings, warnings), (ctx.results, results)):
+        msgs_all.extend(msgs_new)
+    ctx.resignings.update(resignings)
+
+
+@pipeline.stage('elcs', writes=columns_contract, when=lambda args: args.elcs is not None)
+def enter_elcs(ctx: ppln.Context):
+    enter_contracts(ctx, ctx.args.elcs, entry_level=True, extend=False)
+
+
+@pipeline.stage('extensions', writes=columns_contract, when=lambda args: args.extensions is not None)
+def enter_extensions(ctx: ppln.Context):
+    enter_contracts(ctx, ctx.args.extensions, entry_level=False, extend=True)
+
+
+@pipeline.stage('signings', writes=columns_contract, when=lambda args: args.signings is not None)
+def enter_signings(ctx: ppln.Context):
+    enter_contracts(ctx, ctx.args.signings, entry_level=False, extend=False)
+
+
+@pipeline.stage('slides', writes=('years',), when=lambda args: args.slide_eligible)
+def slide_contracts(ctx: ppln.Context):
+    errors, warnings, results, resignings = cntr.slide_contracts(
+        ctx.players, ctx.args.slide_eligible, ctx.args.slide_ineligible,
+    )
+    for msgs_all, msgs_new in ((ctx.errors, errors), (ctx.warnings, warnings), (ctx.results, results)):
+        msgs_all.extend(msgs_new)
+
+
+@pipeline.stage('booster_check', reads=('pot', 'con', 'years') + ppln.columns_birthdate, vectorized=True,
+                when=lambda args: args.draft_year_last)
+def check_boosters(ctx: ppln.Context):
+    tab = ctx.players.table
+    ages = ctx.ages(datetime.fromisoformat(f'{ctx.args.draft_year_last + 1}-09-16'))
+    unsigned = (tab.pot < 70) & (tab.con >= 75) & (tab.years == 0) & (ages >= 19) & (ages < 20)
+    for pid in np.where(unsigned)[0]:
+        ctx.warnings.append(f'Pot booster {ctx.players.get_player(pid)} still unsigned')
+
+
+@pipeline.stage('report')
+def report(ctx: ppln.Context):
+    if ctx.warnings:
         print("Warnings:")
-        for warning in warnings_all:
+        for warning in ctx.warnings:
             print(warning)
-    if errors_all:
+    if ctx.errors:
         print("Errors: ")
-        for error in errors_all:
+        for error in ctx.errors:
             print(error)
-    elif results_all:
+    elif ctx.results:
         print("Results: ")
-        for result in results_all:
+        for result in ctx.results:
             print(result)
-        cntr.summarize(resignings_all)
+        cntr.summarize(ctx.resignings)
+
+
+@pipeline.stage('compare', when=lambda args: args.compare_players is not None)
+def compare_players(ctx: ppln.Context):
+    players = ctx.players
+    players_comp = plyr.Players(ctx.args.compare_players)
+    alignment = players.align(players_comp)
+    if len(alignment.rows) != players.n_players or len(alignment.rows) != players_comp.n_players:
+        print(f'Warning; compared players aligned {alignment.summary()}')
+    tab, tab_comp = players.table.iloc[alignment.rows], players_comp.table.iloc[alignment.rows_other]
+    pot, pot_comp = tab.pot.to_numpy(), tab_comp.pot.to_numpy()
+    boosted, busted = pot > pot_comp, pot < pot_comp
+    failed = ~(boosted | busted) & (tab_comp.draft_year == ctx.args.draft_year_last).to_numpy() & (
+        (tab_comp.pot < 70) & (tab_comp.con >= 75)).to_numpy()
+    for idx in np.where(boosted | busted | failed)[0]:
+        player = players.get_player(alignment.rows[idx])
+        if boosted[idx]:
+            print(f'{player} ({player.rights.name}, {player.con} CON)'
+                  f' boosted from {pot_comp[idx]} to {player.pot}')
+        elif busted[idx]:
+            print(f'{player} ({player.rights.name}, {player.con} CON)'
+                  f' busted from {pot_comp[idx]} to {player.pot}')
+        else:
+            print(f'{player} ({player.rights.name}, {player.con} CON) failed to boost from {player.pot} POT')
+
+
+@pipeline.stage('prospects', reads=('years', 'salary', 'rights'), writes=('years', 'team'), vectorized=True,
+                when=lambda args: args.invite_prospects or args.return_prospects)
+def move_prospects(ctx: ppln.Context):
+    args = ctx.args
+    tab = ctx.players.table
+    years_check = int(args.return_prospects)
+    prospects = ((tab.years == years_check) & (tab.salary == cntr.salary_unsigned)).to_numpy()
+    return {
+        'years': (prospects, 1 - years_check),
+        'team': (prospects, args.invite_prospects*tab.rights.to_numpy()[prospects]),
+    }
+
 
-    if args.compare_players is not None:
-        players_comp = plyr.Players(args.compare_players)
-        for pid in range(players.n_players):
+@pipeline.stage('qualifiers', writes=('rights', 'team', 'years', 'salary'),
+                when=lambda args: args.qualified_rfas is not None)
+def sign_qualifiers(ctx: ppln.Context):
+    cntr.sign_qualifiers(ctx.players, ctx.args.qualified_rfas)
+
+
+@pipeline.stage('juniors', writes=('team',), when=lambda args: args.return_juniors is not None)
+def return_juniors(ctx: ppln.Context):
+    args = ctx.args
+    if args.junior_birthdate is None:
+        raise ValueError('junior_birthdate must be specified if return_juniors is set')
+    date_junior = datetime.strptime(args.junior_birthdate, args.date_format)
+    players = ctx.players
+    with open(args.return_juniors, encoding='UTF-8') as f:
+        for line in f:
+            matched = {}
+            pid = players.find_player_by_fullname(line.strip(), matched=matched)
+            ctx.warnings.extend(players.describe_matched(name, row) for name, row in matched.items())
             player = players.get_player(pid)
-            player_comp = players_comp.get_player(pid)
-            if player.pot > player_comp.pot:
-                print(f'{player} ({player.rights.name}, {player.con} CON)'
-                      f' boosted from {player_comp.pot} to {player.pot}')
-            elif player.pot < player_comp.pot:
-                print(f'{player} ({player.rights.name}, {player.con} CON)'
-                      f' busted from {player_comp.pot} to {player.pot}')
-            elif player_comp.draft_year == args.draft_year_last and player_comp.is_booster:
-                print(f'{player} ({player.rights.name}, {player.con} CON) failed to boost from {player.pot} POT')
-
-    if args.invite_prospects or args.return_prospects:
-        years_check = args.return_prospects
-        years_set = 1 - years_check
-        for idx, player in tab.iterrows():
-            if player.years == years_check and player.salary == cntr.salary_unsigned:
-                tab.loc[idx, 'years'] = years_set
-                tab.loc[idx, 'team'] = args.invite_prospects*player.rights
-
-    if args.qualified_rfas is not None:
-        cntr.sign_qualifiers(players, args.qualified_rfas)
-
-    if args.return_juniors is not None:
-        if date_junior is None:
-            raise ValueError('junior_birthdate must be specified if return_juniors is set')
-        with open(args.return_juniors, encoding='UTF-8') as f:
-            index = tab.index
-            for line in f:
-                pid = players.find_player_by_fullname(line.strip())
-                player = players.get_player(pid)
-                if not player.is_junior(date_junior):
-                    raise RuntimeError(f'{player} birthdate={player.birthdate} not > date_junior={date_junior}')
-                tab.loc[index[pid], 'team'] = teams.Team.none
-
-    if args.reset_invalid_salaries:
-        tab.loc[(tab.salary < cntr.salary_min_league) & (tab.salary != cntr.salary_unsigned), 'salary'] = \
-            cntr.salary_min_league
-    
-    if not args.skip_reset_low_fighting:
-        tab.loc[tab.fi < 10, 'fi'] = 50
-
-    if args.replace_vopatizers:
-        _ = players.replace_vopatizers(print_each=True)
-
-    if args.release_rights_date is not None:
-        date_release = datetime.strptime(args.release_rights_date, args.date_format)
-        for idx, player in tab.iterrows():
-            if (player.team == teams.Team.none.value) and (player.rights <= teams.N_TEAMS) and (
-                    player.rights != teams.Team.none.value) and (player.years == 0):
-                player_obj = players.get_player(idx)
-                if player_obj.birthdate < date_release:
-                    print(f"Releasing rights to {player_obj}")
-                    player_obj.rights = teams.Team.none
-
-    if args.difference is not None:
-        sub = plyr.Players(args.difference)
-        players.subtract(sub)
-
-    if args.output is not None:
-        print(f"Writing modified file to: {args.output}")
-        players.write(args.output)
+            if not player.is_junior(date_junior):
+                raise RuntimeError(f'{player} birthdate={player.birthdate} not > date_junior={date_junior}')
+            player.team = teams.Team.none.value
+
+
+@pipeline.stage('reset_salaries', reads=('salary',), writes=('salary',), vectorized=True,
+                when=lambda args: args.reset_invalid_salaries)
+def reset_invalid_salaries(ctx: ppln.Context):
+    tab = ctx.players.table
+    return {'salary': ((tab.salary < cntr.salary_min_league) & (tab.salary != cntr.salary_unsigned),
+                       cntr.salary_min_league)}
+
+
+@pipeline.stage('reset_fighting', reads=('fi',), writes=('fi',), vectorized=True,
+                when=lambda args: not args.skip_reset_low_fighting)
+def reset_low_fighting(ctx: ppln.Context):
+    return {'fi': (ctx.players.table.fi < 10, 50)}
+
+
+@pipeline.stage('vopatizers', writes=('salary', 'years', 'rights', 'team'),
+                when=lambda args: args.replace_vopatizers)
+def replace_vopatizers(ctx: ppln.Context):
+    _ = ctx.players.replace_vopatizers(print_each=True)
+
+
+@pipeline.stage('release_rights', writes=('rights',), when=lambda args: args.release_rights_date is not None)
+def release_rights(ctx: ppln.Context):
+    players = ctx.players
+    tab = players.table
+    date_release = datetime.strptime(ctx.args.release_rights_date, ctx.args.date_format)
+    releasable = (tab.team == teams.Team.none.value) & teams.registry.is_nhl(tab.rights) & (tab.years == 0) & (
+        ctx.birthdates < date_release)
+    for idx in np.where(releasable)[0]:
+        player_obj = players.get_player(idx)
+        print(f"Releasing rights to {player_obj}")
+        player_obj.rights = teams.Team.none
+
+
+@pipeline.stage('difference', writes=plyr.names_columns[0] + plyr.names_columns[1][:6],
+                when=lambda args: args.difference is not None)
+def subtract(ctx: ppln.Context):
+    sub = plyr.Players(ctx.args.difference)
+    ctx.players.subtract(sub)
+
+
+@pipeline.stage('validate', reads=columns_contract + ('draft_year', 'draft_overall'),
+                when=lambda args: args.validate_contracts is not None)
+def validate_contracts(ctx: ppln.Context):
+    violations = cntr.validate_contracts(ctx.players, years_extra=ctx.args.validate_years_extra)
+    print(f"Found {len(violations)} contract rule violations for {violations.row.nunique()} players")
+    for rule, count in violations.rule.value_counts().items():
+        print(f"{rule}: {count}")
+    violations.to_csv(ctx.args.validate_contracts, index=False)
+
+
+def run(args) -> ppln.Context:
+    if args.profile is not None:
+        profiling.enable(cprofile=args.profile_cprofile, memory=args.profile_memory)
+    try:
+        teams.read_teams(args.config_teams)
+
+        players = plyr.Players(args.players)
+        players.name_threshold = args.name_threshold
+        ctx = ppln.Context(players, args=args)
+        if args.salaries_min is not None:
+            ctx.salaries_min = cntr.read_salaries_min(args.salaries_min)
+            players.join_salaries_min(ctx.salaries_min, default=cntr.salary_min_league)
+
+        timings = pipeline.run(ctx, print_timings=args.profile is not None)
+
+        if args.output is not None:
+            print(f"Writing modified file to: {args.output}")
+            players.write(args.output)
+        if args.journal is not None:
+            print(f"Writing {players.journal.n_values} changed values to: {args.journal}")
+            players.journal.write(args.journal)
+        if args.profile is not None:
+            profiling.add_timings('stages', timings)
+            print(f"Writing profiling report to: {args.profile}")
+            profiling.write_report(args.profile)
+    finally:
+        if args.profile is not None:
+            profiling.disable()
+    return ctx
+
+
+if __name__ == '__main__':
+    run(parse_args())
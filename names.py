@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from collections import defaultdict
+import numpy as np
+from typing import Dict, Iterable, List, Tuple
+import unicodedata
+
+
+def get_trigrams(name: str) -> List[str]:
+    # Padded so that the start and end of a name weigh as much as its middle
+    padded = f'  {name} '
+    return sorted({padded[idx:idx + 3] for idx in range(len(padded) - 2)})
+
+
+def normalize(name: str) -> str:
+    # Case, accents, punctuation and spacing don't distinguish names in input files; "Last, First" is swapped back
+    if ',' in name:
+        name_last, name_first = name.split(',', 1)
+        name = f'{name_first} {name_last}'
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return ' '.join(''.join(char if char.isalnum() else ' ' for char in stripped).split())
+
+
+# Matches scoring lower than this are too different to be worth suggesting
+score_suggest = 0.5
+
+
+class NameIndex:
+    # Normalized full names for exact lookups, and a trigram inverted index so that scoring a query only touches the
+    # players sharing at least one trigram with it
+    exact: Dict[str, np.ndarray] = None
+    exact_last: Dict[str, np.ndarray] = None
+    n_names: int = None
+    n_trigrams: np.ndarray = None
+    postings: Dict[str, np.ndarray] = None
+
+    def find(self, name: str) -> np.ndarray:
+        # Rows whose normalized full name or last name is name's
+        name = normalize(name)
+        empty = np.zeros(0, dtype=np.int64)
+        return np.union1d(self.exact.get(name, empty), self.exact_last.get(name, empty))
+
+    def resolve(self, name_full: str, threshold: float) -> int:
+        # The one best match scoring at least threshold; NameError (with suggestions) if there's none or a tie
+        matches = self.suggest(name_full, n=2)
+        if matches and matches[0][1] >= threshold and (len(matches) == 1 or matches[1][1] < matches[0][1]):
+            return matches[0][0]
+        suggestions = ', '.join(f'row={row} ({score:.2f})' for row, score in matches)
+        raise NameError(f'No player named {name_full} with match score >= {threshold}'
+                        f'{"; best: " + suggestions if suggestions else ""}')
+
+    def resolve_many(self, names_full: Iterable[str], threshold: float) -> np.ndarray:
+        # As resolve, with -1 where it would raise NameError
+        rows = []
+        for name_full in names_full:
+            try:
+                rows.append(self.resolve(name_full, threshold))
+            except NameError:
+                rows.append(-1)
+        return np.array(rows, dtype=np.int64)
+
+    def score(self, name_full: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Dice coefficient over trigrams for every row sharing one with the query; exact normalized matches score 1
+        name = normalize(name_full)
+        exact = self.exact.get(name)
+        if exact is not None:
+            return exact, np.ones(len(exact))
+        trigrams = get_trigrams(name)
+        postings = [self.postings[trigram] for trigram in trigrams if trigram in self.postings]
+        if not postings:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        shared = np.bincount(np.concatenate(postings), minlength=self.n_names)
+        rows = np.flatnonzero(shared)
+        return rows, 2*shared[rows]/(len(trigrams) + self.n_trigrams[rows])
+
+    def suggest(self, name_full: str, n: int = 3, score_min: float = 0.) -> List[Tuple[int, float]]:
+        # Up to n (row, score) best matches scoring at least score_min, best first
+        rows, scores = self.score(name_full)
+        if score_min > 0:
+            kept = scores >= score_min
+            rows, scores = rows[kept], scores[kept]
+        best = np.argpartition(-scores, n)[:n] if len(scores) > n else np.arange(len(scores))
+        best = best[np.lexsort((rows[best], -scores[best]))]
+        return [(int(rows[idx]), float(scores[idx])) for idx in best]
+
+    def __init__(self, names_first: Iterable[str], names_last: Iterable[str]):
+        exact = defaultdict(list)
+        exact_last = defaultdict(list)
+        postings = defaultdict(list)
+        n_trigrams = []
+        for row, (name_first, name_last) in enumerate(zip(names_first, names_last)):
+            name = normalize(f'{name_first} {name_last}')
+            exact[name].append(row)
+            exact_last[normalize(name_last)].append(row)
+            trigrams = get_trigrams(name)
+            n_trigrams.append(len(trigrams))
+            for trigram in trigrams:
+                postings[trigram].append(row)
+        self.n_names = len(n_trigrams)
+        self.n_trigrams = np.array(n_trigrams, dtype=np.int64)
+        self.exact = {name: np.array(rows, dtype=np.int64) for name, rows in exact.items()}
+        self.exact_last = {name: np.array(rows, dtype=np.int64) for name, rows in exact_last.items()}
+        self.postings = {trigram: np.array(rows, dtype=np.int64) for trigram, rows in postings.items()}
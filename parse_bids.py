@@ -1,49 +1,26 @@
 import argparse
+import bids
+import contracts as cntr
 from datetime import datetime
+import players as plyr
 import teams
 
-managers = {
-    'Duckduckdeke': 1,
-    'The-Boss-GM': 3,
-    'Sharp Stick Bisons': 4,
-    None: 6,
-    'Calgary Flames GM': 5,
-    'Bernyhawks': 7,
-    'AvalancheGM': 8,
-    'Leon / Blue Jackets': 2,
-    'Dallas Stars GM': 10,
-    'DetroitGM': 11,
-    None: 12,
-    'PanthersGM': 13,
-    'Kings GM': 14,
-    'Wiild': 15,
-    None: 16,
-    'NashvillePredatorsGM': 19,
-    'DevilsGM (Interim)': 20,
-    'IslandersGM': 17,
-    'NYRNYRNYR': 18,
-    'SensGM': 21,
-    'Gritty': 22,
-    'ArizonaGM': 23,
-    'PittsburghGM': 24,
-    'SharksGM': 25,
-    'St.Louis Blues GM': 26,
-    'TBGM - Geoff': 27,
-    'TorontoGM': 28,
-    'VancouverCanucksGM': 29,
-    'zach washington': 30,
-    'Jets MKB GM': 9,
-}
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Process phpBB UFA bids")
     parser.add_argument('--bids', default='C:/Games/EHM/ufabids.txt', type=str)
+    parser.add_argument('--cap_max', default=None, type=int)
     parser.add_argument('--config_teams', default='C:/Games/EHM/config_teams.ehm', type=str)
+    parser.add_argument('--managers', default='C:/Games/EHM/managers.txt', type=str,
+                        help='File with one "<team id or acronym> - <manager>" line per forum account')
+    parser.add_argument('--output', default=None, type=str)
+    parser.add_argument('--players', default=None, type=str,
+                        help='Players file to sign winning bids to directly instead of printing signings lines')
     parser.add_argument('--rfas', default='C:/Games/EHM/rfa.txt', type=str)
     parser.add_argument('--time_format', default='%a %b %d, %Y %I:%M %p', type=str)
     args = parser.parse_args()
 
     teams.read_teams(args.config_teams)
+    managers = bids.read_managers(args.managers)
     rfas = []
     if args.rfas:
         with open(args.rfas) as file:
@@ -53,25 +30,29 @@ if __name__ == '__main__':
     now = datetime.now()
     print(now.strftime(args.time_format))
 
-    with open(args.bids, encoding='UTF-8') as bids:
-        player, manager = None, None
-        complete = True
-        idx_offset = 0
-        for idx, line in enumerate(bids):
-            idx_mod = 1 + ((idx_offset + idx) % 10)
-            if idx_mod == 1:
-                player = line.strip()
-            elif idx_mod == 2:
-                timestamp = datetime.strptime(line.strip().split(' » ')[1], args.time_format)
-                complete &= (now - timestamp).days >= 2
-            elif idx_mod == 3 and line.strip() == "":
-                idx_offset -= 1
-            elif idx_mod == 8:
-                manager = line.strip().split('by ')[1]
-            elif idx_mod == 9:
-                timestamp = datetime.strptime(line.strip(), args.time_format)
-                complete &= (now - timestamp).days >= 1
-            elif idx_mod == 10:
-                if complete:
-                    print(f'{player} 1y 600k {teams.Team(managers[manager])}')
-                complete = True
+    with open(args.bids, encoding='UTF-8') as file:
+        bids_complete = [bid for bid in bids.read_bids(file, time_format=args.time_format, managers=managers)
+                         if bid.is_complete(now)]
+
+    unknown = bids.summarize_unknown_managers(bids_complete)
+    if unknown:
+        print(f"Unknown managers ({len(unknown)}); add them to {args.managers}:")
+        for manager, bids_manager in unknown.items():
+            print(f"{manager}: {len(bids_manager)} bids ({', '.join(bid.player for bid in bids_manager)})")
+
+    if args.players is None:
+        for bid in bids_complete:
+            if bid.team is not None:
+                print(f'{bid.player} {bid.years}y {bid.salary // 1000}k {bid.team}')
+    else:
+        players = plyr.Players(args.players)
+        errors, warnings, results, signings = bids.resolve_bids(players, bids_complete, cap_max=args.cap_max)
+        for title, msgs in (("Warnings:", warnings), ("Errors: ", errors), ("Results: ", results)):
+            if msgs:
+                print(title)
+                for msg in msgs:
+                    print(msg)
+        cntr.summarize(signings)
+        if args.output is not None:
+            print(f"Writing modified file to: {args.output}")
+            players.write(args.output)
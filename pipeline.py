@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import lazy
+import players as plyr
+
+pd = lazy.load('pandas')
+
+columns_birthdate = ('byear', 'bmonth', 'bday')
+columns_overall = ('sh', 'pl', 'st', 'ch', 'po', 'hi', 'sk')
+
+# A vectorized stage returns its updates instead of applying them, as {column: (mask, values)}
+Updates = Dict[str, Tuple[Any, Any]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: Callable
+    reads: Tuple[str, ...] = ()
+    writes: Tuple[str, ...] = ()
+    vectorized: bool = False
+    when: Callable = None
+
+    def is_enabled(self, args) -> bool:
+        return (self.when is None) or bool(self.when(args))
+
+
+class Context:
+    args: Any = None
+    players: plyr.Players = None
+    salaries_min: pd.Series = None
+
+    def ages(self, date: datetime) -> np.ndarray:
+        return self.derived(('ages', date), columns_birthdate, lambda: (
+            (pd.Timestamp(date) - self.birthdates).dt.days / 365.25).to_numpy())
+
+    def ages_years(self, date: datetime) -> np.ndarray:
+        # Whole years, as dateutil's relativedelta(date, birthdate).years
+        def compute():
+            tab = self.players.table
+            before = (tab.bmonth > date.month) | ((tab.bmonth == date.month) & (tab.bday > date.day))
+            return (date.year - tab.byear - before).to_numpy()
+        return self.derived(('ages_years', date), columns_birthdate, compute)
+
+    @property
+    def birthdates(self) -> pd.Series:
+        return self.derived(('birthdates',), columns_birthdate, self.players.get_birthdates)
+
+    def derived(self, key: Tuple, columns: Tuple[str, ...], compute: Callable):
+        value = self._derived.get(key)
+        if value is None:
+            value = (columns, compute())
+            self._derived[key] = value
+        return value[1]
+
+    def invalidate(self, columns):
+        columns = set(columns)
+        for key in [key for key, (depends, _) in self._derived.items() if columns.intersection(depends)]:
+            del self._derived[key]
+
+    def overall(self, simple: bool = True) -> np.ndarray:
+        return self.derived(('overall', simple), columns_overall, lambda: self.players.get_overall(simple=simple))
+
+    def __init__(self, players: plyr.Players, args: Any = None):
+        self.args = args
+        self.players = players
+        self.errors = []
+        self.warnings = []
+        self.results = []
+        self.resignings = {}
+        self._derived = {}
+
+
+class Pipeline:
+    stages: List[Stage] = None
+
+    def apply(self, context: Context, updates: List[Updates]):
+        changes = defaultdict(list)
+        for update in updates:
+            for column, change in update.items():
+                changes[column].append(change)
+        players = context.players
+        for column, changes_column in changes.items():
+            values_orig = players.table[column].to_numpy()
+            values_column = values_orig.copy()
+            for mask, values in changes_column:
+                values_column[np.asarray(mask)] = values
+            rows = np.flatnonzero(values_column != values_orig)
+            players.set_values(rows, column, values_column[rows])
+        context.invalidate(changes.keys())
+
+    def fuse(self, stages: List[Stage]) -> List[List[Stage]]:
+        # Consecutive vectorized stages are evaluated against the same table and their updates applied together,
+        # unless one reads a column that an earlier stage in the group writes
+        groups = []
+        written = set()
+        for stage in stages:
+            if stage.vectorized and groups and groups[-1][-1].vectorized and not written.intersection(stage.reads):
+                groups[-1].append(stage)
+                written.update(stage.writes)
+            else:
+                groups.append([stage])
+                written = set(stage.writes)
+        return groups
+
+    def run(self, context: Context, print_timings: bool = True) -> Dict[str, float]:
+        timings = {}
+        stages = [stage for stage in self.stages if stage.is_enabled(context.args)]
+        for group in self.fuse(stages):
+            if group[0].vectorized:
+                updates = []
+                for stage in group:
+                    time_begin = time.perf_counter()
+                    update = stage.func(context)
+                    timings[stage.name] = time.perf_counter() - time_begin
+                    if update:
+                        updates.append(update)
+                time_begin = time.perf_counter()
+                self.apply(context, updates)
+                timings[f"apply[{','.join(stage.name for stage in group)}]"] = time.perf_counter() - time_begin
+            else:
+                stage = group[0]
+                time_begin = time.perf_counter()
+                stage.func(context)
+                context.invalidate(stage.writes)
+                timings[stage.name] = time.perf_counter() - time_begin
+        if print_timings:
+            print("Stage timings:")
+            for name, seconds in timings.items():
+                print(f"{name}: {seconds:.3f}s")
+        return timings
+
+    def stage(self, name: str, reads: Tuple[str, ...] = (), writes: Tuple[str, ...] = (), vectorized: bool = False,
+              when: Callable = None):
+        def register(func: Callable):
+            self.stages.append(Stage(name=name, func=func, reads=tuple(reads), writes=tuple(writes),
+                                     vectorized=vectorized, when=when))
+            return func
+        return register
+
+    def __init__(self):
+        self.stages = []
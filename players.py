@@ -2,15 +2,20 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 from enum import IntEnum
 import numpy as np
-import pandas as pd
 from textwrap import wrap
-from typing import Any, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
+import columnar
+from journal import Journal
+import lazy
+import names
 import teams
 
+pd = lazy.load('pandas')
+dateutil_relativedelta = lazy.load('dateutil.relativedelta')
+
 names_columns = (
     ('sh', 'pl', 'st', 'ch', 'po', 'hi', 'sk', 'en', 'pe', 'fa'),
     ('le', 'str', 'pot', 'con', 'gre', 'fi', 'click', 'team', 'position', 'country', 'hand'),
@@ -74,6 +79,43 @@ class Country(IntEnum):
     FRA = 18
     JAP = 19
 
+# Draft info distinguishes namesakes born on the same day, but changes when a player is drafted between saves
+columns_identity = ('name_first', 'name_last', 'byear', 'bmonth', 'bday', 'draft_year', 'draft_round', 'draft_team',
+                    'draft_overall')
+columns_identity_fallback = ('name_first', 'name_last', 'byear', 'bmonth', 'bday')
+# scout_<id> is team id's scouting level of the player
+columns_scout = names_columns[7] + names_columns[8] + names_columns[9]
+
+
+@dataclass
+class Alignment:
+    # Matched rows are parallel arrays; unmatched rows are per-table
+    rows: np.ndarray
+    rows_other: np.ndarray
+    added: np.ndarray
+    removed: np.ndarray
+    ambiguous: np.ndarray
+    ambiguous_other: np.ndarray
+
+    def summary(self) -> str:
+        return (f'{len(self.rows)} matched, {len(self.added)} added, {len(self.removed)} removed,'
+                f' {len(self.ambiguous)}/{len(self.ambiguous_other)} ambiguous')
+
+
+def get_identity_keys(table: pd.DataFrame, columns: Iterable[str] = columns_identity) -> np.ndarray:
+    return pd.util.hash_pandas_object(table[list(columns)], index=False).to_numpy()
+
+
+def join_keys(keys: np.ndarray, keys_other: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Hash join on unique keys; a key that's duplicated in either table can't be matched and is ambiguous
+    dupes, dupes_other = pd.Index(keys).duplicated(keep=False), pd.Index(keys_other).duplicated(keep=False)
+    ambiguous = dupes | np.isin(keys, keys_other[dupes_other])
+    ambiguous_other = dupes_other | np.isin(keys_other, keys[dupes])
+    rows, rows_other = np.flatnonzero(~ambiguous), np.flatnonzero(~ambiguous_other)
+    found = pd.Index(keys_other[rows_other]).get_indexer(keys[rows])
+    matched = found >= 0
+    return rows[matched], rows_other[found[matched]], ambiguous, ambiguous_other
+
 
 def get_names(name_full: str):
     return name_full.split(" ", 1)
@@ -83,6 +125,7 @@ def get_names(name_full: str):
 class PlayerRow:
     idx: int
     tab: pd.DataFrame
+    journal: Journal = None
 
     def __repr__(self):
         return f"PlayerRow({self.idx}/{len(self.tab)})"
@@ -91,7 +134,12 @@ class PlayerRow:
         return self.tab.at[self.idx, item]
 
     def set(self, item: str, value: Any):
-        self.tab.at[self.idx, item] = value
+        if self.journal is None:
+            self.tab.at[self.idx, item] = value
+        else:
+            old = self.tab.at[self.idx, item]
+            self.tab.at[self.idx, item] = value
+            self.journal.record(item, np.array([self.idx]), np.array([old]), np.array([self.tab.at[self.idx, item]]))
 
 
 @dataclass
@@ -155,12 +203,8 @@ class Player:
 
     @property
     def team(self) -> teams.Team:
-        team = self.row.get('team')
-        try:
-            return teams.Team(team)
-        except:
-            # TODO: Fix this farm hack
-            return teams.Team(team - teams.N_TEAMS)
+        # Farm team ids map to their NHL affiliate
+        return teams.registry.get_team(self.row.get('team'))
 
     @team.setter
     def team(self, team: teams.Team):
@@ -188,8 +232,8 @@ class Player:
         return f"Player {self.name_last}, {self.name_first} [team:{self.team.name}, rights:{self.rights.name}]," \
                f" {self.age():.2f}yrs, {self.salary}x{self.years}"
 
-    def __init__(self, idx: int, tab: pd.DataFrame, **kwargs):
-        self.row = PlayerRow(idx=idx, tab=tab)
+    def __init__(self, idx: int, tab: pd.DataFrame, journal: Journal = None, **kwargs):
+        self.row = PlayerRow(idx=idx, tab=tab, journal=journal)
         invalid = []
         for arg in kwargs:
             if not hasattr(self, arg):
@@ -207,6 +251,17 @@ class Player:
 
 
 class Players:
+    journal: Journal = None
+    # Identity keys as of load, or of the last get_keys after an identity column was written
+    keys: np.ndarray = None
+    # Journal entries when keys were computed; later entries for columns_identity make them stale
+    keys_entries: int = None
+    # Fuzzy-match names that don't match exactly when set, accepting the best match scoring at least this
+    name_index: names.NameIndex = None
+    # Journal entries when name_index was built; later name_first/name_last entries make it stale
+    name_index_entries: int = None
+    name_threshold: float = None
+    salaries_min: np.ndarray = None
     table: pd.DataFrame = None
 
     @staticmethod
@@ -225,8 +280,84 @@ class Players:
     def column_is_numeric(idx: int):
         return (idx <= 11) or (idx == 19)
 
-    def find_player_by_fullname(self, name_full: str) -> int:
-        return self.find_player_by_names(*get_names(name_full))
+    @staticmethod
+    def dtypes() -> Dict[str, str]:
+        dtypes = {
+            column: 'int64' if (Players.column_is_numeric(idx) or idx == 16) else 'str'
+            for idx, columns in enumerate(names_columns) for column in columns
+        }
+        dtypes['index'] = 'int64'
+        return dtypes
+
+    def align(self, other: Players) -> Alignment:
+        # Match rows by identity rather than position, falling back to name and birthdate for the rest
+        rows, rows_other, ambiguous, ambiguous_other = join_keys(self.get_keys(), other.get_keys())
+        unmatched = np.ones(self.n_players, dtype=bool)
+        unmatched[rows] = False
+        unmatched_other = np.ones(other.n_players, dtype=bool)
+        unmatched_other[rows_other] = False
+        left, right = np.flatnonzero(unmatched), np.flatnonzero(unmatched_other)
+        rows_fb, rows_other_fb, ambiguous_fb, ambiguous_other_fb = join_keys(
+            self.get_keys(columns_identity_fallback)[left], other.get_keys(columns_identity_fallback)[right])
+        rows, rows_other = np.concatenate((rows, left[rows_fb])), np.concatenate((rows_other, right[rows_other_fb]))
+        order = np.argsort(rows, kind='stable')
+        unmatched[left[rows_fb]] = False
+        unmatched_other[right[rows_other_fb]] = False
+        ambiguous = unmatched & np.isin(np.arange(self.n_players), left[ambiguous_fb])
+        ambiguous_other = unmatched_other & np.isin(np.arange(other.n_players), right[ambiguous_other_fb])
+        return Alignment(
+            rows=rows[order], rows_other=rows_other[order],
+            added=np.flatnonzero(unmatched & ~ambiguous), removed=np.flatnonzero(unmatched_other & ~ambiguous_other),
+            ambiguous=np.flatnonzero(ambiguous), ambiguous_other=np.flatnonzero(ambiguous_other),
+        )
+
+    def describe_suggestions(self, name_full: str) -> str:
+        # The closest names in the save, as a suffix for an error message about a name that isn't found
+        tab = self.table
+        matches = self.get_name_index().suggest(name_full, score_min=names.score_suggest)
+        suggestions = ', '.join(f'{tab.name_first.iat[row]} {tab.name_last.iat[row]} ({score:.2f})'
+                                for row, score in matches)
+        return f'; did you mean {suggestions}?' if suggestions else ''
+
+    def describe_unfound(self, name_full: str) -> str:
+        return f"Couldn't find player: {name_full} ({get_names(name_full)}){self.describe_suggestions(name_full)}"
+
+    def describe_matched(self, name_full: str, row: int) -> str:
+        tab = self.table
+        return f"Matched player: {name_full} to {tab.name_first.iat[row]} {tab.name_last.iat[row]}"
+
+    def find_player_by_fullname(self, name_full: str, threshold: float = None, matched: Dict[str, int] = None) -> int:
+        # A fuzzy match, if any, is added to matched rather than reported, so that callers can warn or reject it
+        if threshold is None:
+            threshold = self.name_threshold
+        if threshold is None:
+            return self.find_player_by_names(*get_names(name_full))
+        rows, matched_new = self.find_players_by_fullnames([name_full], threshold=threshold)
+        if rows[0] < 0:
+            raise NameError(f'No player named {name_full} or matching it with score >= {threshold}')
+        if matched is not None:
+            matched.update(matched_new)
+        return rows[0]
+
+    def find_players_by_fullnames(self, names_full: Iterable[str], threshold: float = None
+                                  ) -> Tuple[np.ndarray, Dict[str, int]]:
+        # Rows as find_player_by_fullname for many names at once, with -1 where it would raise NameError, and the
+        # names that were only fuzzy matched with their rows
+        names_full = list(names_full)
+        if threshold is None:
+            threshold = self.name_threshold
+        tab = self.table
+        keys = (tab.name_first + '\n' + tab.name_last).to_numpy()
+        unique = ~pd.Index(keys).duplicated(keep=False)
+        queries = ['\n'.join(names) if len(names) == 2 else '' for names in map(get_names, names_full)]
+        found = pd.Index(keys[unique]).get_indexer(queries)
+        rows = np.where(found >= 0, np.flatnonzero(unique)[found], -1)
+        matched = {}
+        if threshold is not None:
+            unfound = np.flatnonzero(rows < 0)
+            rows[unfound] = self.get_name_index().resolve_many([names_full[idx] for idx in unfound], threshold)
+            matched = {names_full[idx]: int(rows[idx]) for idx in unfound[rows[unfound] >= 0]}
+        return rows, matched
 
     def find_player_by_names(self, name_first: str, name_last: str) -> int:
         pids = np.where((name_first == self.table['name_first']) & (name_last == self.table['name_last']))[0]
@@ -235,7 +366,8 @@ class Players:
         return pids[0]
 
     def find_retirees(self, date: datetime = None, num: int = None, print_summary: bool = True,
-                      age_any: int = None, age_expired: int = None, age_expiring: int = None):
+                      age_any: int = None, age_expired: int = None, age_expiring: int = None,
+                      ages: np.ndarray = None, overalls: pd.Series = None):
         if date is None:
             date = datetime(year=datetime.today().year, month=9, day=16)
         if num is None:
@@ -246,13 +378,15 @@ class Players:
             age_expired = 37
         if age_expiring is None:
             age_expiring = 30
-        ages = np.array([relativedelta(date, bday).years for bday in self.get_birthdates()])
-        overalls = self.get_overall()
+        if ages is None:
+            ages = np.array([dateutil_relativedelta.relativedelta(date, bday).years for bday in self.get_birthdates()])
+        if overalls is None:
+            overalls = self.get_overall()
         years = self.table['years']
         retiring = np.zeros_like(years, dtype=bool)
 
         stages = (
-            (age_any, np.Inf, 'age_any'),
+            (age_any, np.inf, 'age_any'),
             (age_expired, 0, 'age_expired'),
             (age_expiring, 1, 'age_expiring'),
         )
@@ -299,14 +433,43 @@ class Players:
             print(self.table[['name_first', 'name_last', 'byear', 'bmonth', 'bday']].iloc[bad])
         return bdates
 
+    def get_name_index(self) -> names.NameIndex:
+        # Rebuilt if a name was written since, including through Player attributes, which only the journal sees
+        entries = self.journal.columns[self.name_index_entries:] if self.name_index is not None else ()
+        if self.name_index is None or self.name_index.n_names != self.n_players or any(
+                column in ('name_first', 'name_last') for column in entries):
+            self.name_index = names.NameIndex(self.table.name_first, self.table.name_last)
+            self.name_index_entries = len(self.journal)
+        return self.name_index
+
     def get_overall(self, simple: bool = True):
         if simple:
             return self.table.loc[:, ['sh', 'pl', 'st', 'ch', 'po', 'hi']].aggregate('mean', axis=1)
         else:
             return self.table.loc[:, ['sh', 'pl', 'st', 'ch', 'po', 'hi', 'sk']].aggregate('mean', axis=1)
 
+    def get_scouting(self) -> np.ndarray:
+        # Players x teams as one contiguous uint8 array; column id - 1 is team id's scouting level
+        values = self.table[list(columns_scout)].to_numpy()
+        if values.size > 0 and (values.min() < 0 or values.max() > np.iinfo(np.uint8).max):
+            raise ValueError(f'Scouting levels must be in [0, {np.iinfo(np.uint8).max}]; found'
+                             f' [{values.min()}, {values.max()}]')
+        # Only copies if the columns aren't already one uint8 block
+        return np.ascontiguousarray(values, dtype=np.uint8)
+
+    def get_keys(self, columns: Iterable[str] = columns_identity) -> np.ndarray:
+        # Recomputed, like the name index, if an identity column was written since, which only the journal sees
+        if columns is not columns_identity:
+            return get_identity_keys(self.table, columns)
+        entries = self.journal.columns[self.keys_entries:] if self.keys is not None else ()
+        if self.keys is None or len(self.keys) != self.n_players or any(
+                column in columns_identity for column in entries):
+            self.keys = get_identity_keys(self.table)
+            self.keys_entries = len(self.journal)
+        return self.keys
+
     def get_player(self, pid: int) -> Player:
-        player = Player(pid, self.table)
+        player = Player(pid, self.table, journal=self.journal)
         return player
 
     @property
@@ -318,10 +481,10 @@ class Players:
             date_as_of = datetime.now()
         bdates = self.get_birthdates()
         tab = self.table
-        ages = (pd.Timestamp(date_as_of) - bdates).days / 365.25
-        releases = np.where((ages > age) & (tab.rights < teams.N_TEAMS))[0]
-        tab.loc[releases, 'rights'] = teams.Team.UFA
-        return [Player(tab.iloc[x]) for x in releases]
+        ages = (pd.Timestamp(date_as_of) - bdates).dt.days / 365.25
+        releases = np.where((ages > age) & teams.registry.is_nhl(tab.rights))[0]
+        self.set_values(releases, 'rights', teams.Team.UFA.value)
+        return [self.get_player(x) for x in releases]
 
     def replace_vopatizers(
             self, age_min: float = 30, ov_max: float = 60, years_max: int = 1, date_as_of: datetime = None,
@@ -333,72 +496,155 @@ class Players:
         ages = np.array([x.days/365.25 for x in pd.Timestamp(date_as_of) - bdates])
         ov = self.get_overall()
         tab = self.table
-        vopats = (ages > age_min) & (ov < ov_max) & (tab.team > teams.N_TEAMS) & (tab.years > 0) & (
+        vopats = (ages > age_min) & (ov < ov_max) & teams.registry.is_farm(tab.team) & (tab.years > 0) & (
                 tab.years <= years_max)
         replacements = (ages < (age_min - 1)) & (ov < ov_max) & (tab.rights == teams.Team.UFA.value) & (
                 tab.pot > potential_min)
 
         replaced = []
         for idx in np.where(vopats)[0]:
-            vopat = Player(idx, tab)
+            vopat = self.get_player(idx)
             position = vopat.position
             replacer = np.where(replacements & ((tab.position == position) | (tab.position_alt == position)))[0]
             if len(replacer) > 0:
                 replacements[replacer[0]] = False
-                replacer = Player(replacer[0], tab)
+                replacer = self.get_player(replacer[0])
             else:
-                raise RuntimeError(f"Couldn't find vopatizer replacement for {Player(vopat)}")
+                raise RuntimeError(f"Couldn't find vopatizer replacement for {vopat}")
             if print_each:
                 print(f"Replacing vopatizer {vopat} with {replacer}")
             replacer.salary = vopat.salary
             replacer.years = vopat.years
             replacer.rights = vopat.rights
-            replacer.team = vopat.team
-            # TODO: Set farm teams properly instead
-            replacer.row.tab.loc[replacer.row.idx, 'team'] += 30
+            replacer.team = teams.registry.get_farm_id(vopat.team)
             vopat.rights = teams.Team.UFA
             vopat.team = teams.Team.none
             vopat.years = 0
             replaced.append((vopat, replacer))
         return replaced
 
+    def rollback(self, savepoint: int = 0):
+        self.journal.rollback(self.table, savepoint=savepoint)
+        self.keys = None
+        self.name_index = None
+
+    def savepoint(self) -> int:
+        return self.journal.savepoint()
+
+    def set_values(self, rows, column: str, values):
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        tab = self.table
+        position = tab.columns.get_loc(column)
+        old = tab.iloc[rows, position].to_numpy(copy=True)
+        tab.iloc[rows, position] = values
+        if self.journal is not None:
+            self.journal.record(column, rows, old, tab.iloc[rows, position].to_numpy(copy=True))
+
+    def set_scouting(self, scouting: np.ndarray, rows=None):
+        # Write back a (rows x teams) scouting matrix, only setting the levels that changed
+        rows = np.arange(self.n_players) if rows is None else np.asarray(rows)
+        scouting = np.asarray(scouting)
+        if scouting.shape != (len(rows), len(columns_scout)):
+            raise ValueError(f'Scouting shape={scouting.shape} != expected={(len(rows), len(columns_scout))}')
+        current = self.get_scouting()[rows]
+        for idx, column in enumerate(columns_scout):
+            changed = current[:, idx] != scouting[:, idx]
+            if np.any(changed):
+                self.set_values(rows[changed], column, scouting[changed, idx].astype(np.int64))
+
     def subtract(self, players: Players, columns=None):
         if columns is None:
             columns = ['sh', 'pl', 'st', 'ch', 'po', 'hi', 'sk', 'en', 'pe', 'fa',
                        'le', 'str', 'pot', 'con', 'gre', 'fi']
-            self.table[columns] -= players.table[columns]
+        alignment = self.align(players)
+        if len(alignment.rows) != self.n_players:
+            print(f'Warning; subtracting players aligned {alignment.summary()}; unmatched players are unchanged')
+        for column in columns:
+            diffs = players.table[column].to_numpy()[alignment.rows_other]
+            changed = diffs != 0
+            rows = alignment.rows[changed]
+            self.set_values(rows, column, self.table[column].to_numpy()[rows] - diffs[changed])
 
     def write(self, filename):
         if filename[-3:] == 'csv':
             self.write_csv(filename, index=False, encoding='cp1252')
         elif filename[-3:] == 'ehm':
             self.write_ehm(filename)
+        elif columnar.is_columnar(filename):
+            self.write_columnar(filename)
         else:
-            ValueError(f'Unknown extension for output filename={filename}')
+            raise ValueError(f'Unknown extension for output filename={filename}')
+
+    def write_columnar(self, filename):
+        columnar.write(self.table, filename, Players.dtypes())
 
     def write_csv(self, filename, **kwargs):
         self.table.to_csv(filename, **kwargs)
 
+    def join_salaries_min(self, salaries_min: pd.Series, default: int):
+        # Row-aligned minimum salaries from a Series by full name, with default for players not in it
+        names = self.table.name_first + ' ' + self.table.name_last
+        self.salaries_min = salaries_min.reindex(names.to_numpy()).fillna(default).to_numpy(dtype=np.int64)
+
+    def lines_ehm(self, rows=None) -> List[str]:
+        # All of the given players' lines, or a RuntimeError naming the player with a value that can't be written
+        tab = self.table if rows is None else self.table.iloc[rows]
+        lines = []
+        for idx, row in zip(range(self.n_players) if rows is None else rows, tab.itertuples()):
+            for idx_col, cols in enumerate(names_columns):
+                try:
+                    if Players.column_is_numeric(idx_col):
+                        string = ''.join(f"{getattr(row, col): d} " for col in cols)
+                    elif idx_col == 16:
+                        string = ''.join(f"{getattr(row, col):03d}" for col in cols)
+                    else:
+                        string = ' '.join(getattr(row, col) for col in cols)
+                except Exception as err:
+                    raise RuntimeError(f'{err} from line {idx_col} of player: {self.get_player(idx)}') from err
+                lines.append(f'{string}\n')
+        return lines
+
+    def update_ehm(self, filename, rows=None):
+        # Re-write only the given players' lines (by default, those changed in the journal) of an existing file
+        if rows is None:
+            rows = self.journal.rows_changed()
+        with open(filename, 'r', encoding='cp1252') as file:
+            lines = file.readlines()
+        n_expected = Players.lines_expected(self.n_players)
+        if len(lines) != n_expected:
+            raise RuntimeError(f'Player file {filename} has n_lines={len(lines)} != expected={n_expected}')
+        lines_per_player = Players.lines_per_player()
+        # Every line is built before the file is opened, so a bad value leaves it untouched
+        lines_new = self.lines_ehm(rows)
+        for idx_new, idx in enumerate(rows):
+            line_start = 1 + idx*lines_per_player
+            lines[line_start:line_start + lines_per_player] = lines_new[
+                idx_new*lines_per_player:(idx_new + 1)*lines_per_player]
+        with open(filename, 'w', encoding='cp1252') as file:
+            file.writelines(lines)
+
     def write_ehm(self, filename):
+        lines = self.lines_ehm()
         with open(filename, 'w', encoding='cp1252') as file:
             file.write(f' {self.n_players} \n')
-            tab = self.table
-            for idx, row in enumerate(tab.itertuples()):
-                for idx_col, cols in enumerate(names_columns):
-                    try:
-                        if Players.column_is_numeric(idx_col):
-                            string = ''.join(f"{getattr(row, col): d} " for col in cols)
-                        elif idx_col == 16:
-                            string = ''.join(f"{getattr(row, col):03d}" for col in cols)
-                        else:
-                            string = ' '.join(getattr(row, col) for col in cols)
-                        file.write(f'{string}\n')
-                    except Exception as err:
-                        print(f'{err} from player:')
-                        print(Player(tab.iloc[idx]))
-
-    def __init__(self, filename):
-        with open(filename, 'r') as file:
+            file.writelines(lines)
+
+    def _set_keys(self):
+        # Only a projection without the identity columns leaves the keys unset
+        if all(column in self.table.columns for column in columns_identity):
+            self.keys = get_identity_keys(self.table)
+            self.keys_entries = len(self.journal)
+
+    def __init__(self, filename, columns: Iterable[str] = None):
+        self.journal = Journal()
+        projection = None if columns is None else list(columns)
+        if columnar.is_columnar(filename):
+            self.table = columnar.read(filename, Players.dtypes(), columns=projection)
+            self._set_keys()
+            return
+        with open(filename, 'r', encoding='cp1252') as file:
             if filename[-3:] == 'ehm':
                 lines = file.readlines()
                 n_players = int(lines[0])
@@ -449,3 +695,6 @@ class Players:
                 self.table = tab
             else:
                 raise ValueError(f'Unknown extension for filename={filename}')
+        if projection is not None:
+            self.table = self.table[projection]
+        self._set_keys()
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from columnar_test import make_players_ehm
+import players as plyr
+
+
+@pytest.fixture
+def load(tmp_path):
+    # Players from the same generated players, of which the first n_players match between calls
+    def load(n_players: int) -> plyr.Players:
+        filename = tmp_path / f'players_{n_players}.ehm'
+        filename.write_text(make_players_ehm(n_players), encoding='cp1252')
+        return plyr.Players(str(filename))
+    return load
+
+
+def set_identity(players: plyr.Players, row: int, row_from: int, columns=plyr.columns_identity):
+    for column in columns:
+        players.set_values([row], column, [players.table[column].iat[row_from]])
+
+
+def test_align_same(load):
+    alignment = load(5).align(load(5))
+    assert alignment.rows.tolist() == alignment.rows_other.tolist() == [0, 1, 2, 3, 4]
+    assert len(alignment.added) == len(alignment.removed) == 0
+
+
+def test_align_added_removed(load):
+    players, players_other = load(6), load(4)
+    alignment = players.align(players_other)
+    assert alignment.rows.tolist() == alignment.rows_other.tolist() == [0, 1, 2, 3]
+    assert alignment.added.tolist() == [4, 5]
+    assert alignment.removed.tolist() == []
+    alignment = players_other.align(players)
+    assert alignment.added.tolist() == []
+    assert alignment.removed.tolist() == [4, 5]
+
+
+def test_align_moved(load):
+    players, players_other = load(5), load(5)
+    order = np.array([3, 0, 4, 1, 2])
+    players_other.table = players_other.table.iloc[order].reset_index(drop=True)
+    players_other.keys = None
+    alignment = players.align(players_other)
+    assert alignment.rows.tolist() == [0, 1, 2, 3, 4]
+    assert alignment.rows_other.tolist() == np.argsort(order).tolist()
+
+
+def test_align_ambiguous(load):
+    players, players_other = load(5), load(5)
+    set_identity(players, 1, 0)
+    alignment = players.align(players_other)
+    assert alignment.ambiguous.tolist() == [0, 1]
+    assert alignment.ambiguous_other.tolist() == [0]
+    assert alignment.removed.tolist() == [1]
+    assert alignment.rows.tolist() == alignment.rows_other.tolist() == [2, 3, 4]
+
+
+def test_align_fallback(load):
+    players, players_other = load(5), load(5)
+    # Drafted between the saves: the full keys differ but name and birthdate still match
+    players.set_values([2], 'draft_overall', [players.table.draft_overall.iat[2] + 1])
+    players.set_values([2], 'draft_team', [players.table.draft_team.iat[2] + 1])
+    alignment = players.align(players_other)
+    assert alignment.rows.tolist() == alignment.rows_other.tolist() == [0, 1, 2, 3, 4]
+    # Namesakes born on the same day can only be told apart by draft info
+    set_identity(players, 4, 3, plyr.columns_identity_fallback)
+    set_identity(players_other, 4, 3, plyr.columns_identity_fallback)
+    alignment = players.align(players_other)
+    assert alignment.rows.tolist() == alignment.rows_other.tolist() == [0, 1, 2, 3, 4]
+    # Once one of them has changed draft info, only that namesake is left over to match by name and birthdate
+    players.set_values([3], 'draft_year', [players.table.draft_year.iat[3] + 1])
+    alignment = players.align(players_other)
+    assert alignment.rows.tolist() == alignment.rows_other.tolist() == [0, 1, 2, 3, 4]
+    # But if both have, there's no telling which is which
+    players.set_values([4], 'draft_year', [players.table.draft_year.iat[4] + 1])
+    alignment = players.align(players_other)
+    assert alignment.rows.tolist() == [0, 1, 2]
+    assert alignment.ambiguous.tolist() == alignment.ambiguous_other.tolist() == [3, 4]
+    assert len(alignment.added) == len(alignment.removed) == 0
+
+
+def test_keys_refresh(load):
+    players = load(5)
+    keys = players.get_keys().copy()
+    players.set_values([1], 'salary', [1000000])
+    assert np.array_equal(players.get_keys(), keys)
+    savepoint = players.savepoint()
+    players.set_values([1], 'name_last', ['Renamed'])
+    keys_renamed = players.get_keys()
+    assert np.flatnonzero(keys_renamed != keys).tolist() == [1]
+    assert np.array_equal(keys_renamed, plyr.get_identity_keys(players.table))
+    players.rollback(savepoint)
+    assert np.array_equal(players.get_keys(), keys)
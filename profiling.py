@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import cProfile
+from dataclasses import asdict, dataclass
+import functools
+import importlib
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+enabled = False
+
+
+@dataclass
+class Record:
+    calls: int = 0
+    seconds: float = 0.
+    rows: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+
+def _arg(args, kwargs, idx: int, name: str):
+    return args[idx] if len(args) > idx else kwargs.get(name)
+
+
+def _size(filename) -> int:
+    return os.path.getsize(filename) if filename is not None and os.path.exists(filename) else 0
+
+
+# Extractors are called as extract(args, kwargs, result) after each instrumented call
+targets = {
+    'players.Players.__init__': dict(
+        rows=lambda args, kwargs, result: args[0].n_players,
+        bytes_read=lambda args, kwargs, result: _size(_arg(args, kwargs, 1, 'filename')),
+    ),
+    'players.Players.write_ehm': dict(
+        rows=lambda args, kwargs, result: args[0].n_players,
+        bytes_written=lambda args, kwargs, result: _size(_arg(args, kwargs, 1, 'filename')),
+    ),
+    'players.Players.find_retirees': dict(rows=lambda args, kwargs, result: int(result.sum())),
+    'players.Players.replace_vopatizers': dict(rows=lambda args, kwargs, result: len(result)),
+    'contracts.enter_contracts': dict(rows=lambda args, kwargs, result: len(_arg(args, kwargs, 1, 'contracts'))),
+    'contracts.slide_contracts': dict(rows=lambda args, kwargs, result: len(result[0]) + len(result[2])),
+    'schedule.Schedule.__init__': dict(
+        rows=lambda args, kwargs, result: args[0].n_games_max,
+        bytes_read=lambda args, kwargs, result: _size(_arg(args, kwargs, 1, 'filename')),
+    ),
+    'schedule.Schedule.write_ehm': dict(
+        rows=lambda args, kwargs, result: args[0].n_games_max,
+        bytes_written=lambda args, kwargs, result: _size(_arg(args, kwargs, 1, 'filename')),
+    ),
+}
+
+records: Dict[str, Record] = {}
+timings: Dict[str, Dict[str, float]] = {}
+_originals: List[Tuple[object, str, Callable]] = []
+_profiler: cProfile.Profile = None
+
+
+def disable():
+    global enabled
+    global _profiler
+    for owner, attr, func in reversed(_originals):
+        setattr(owner, attr, func)
+    _originals.clear()
+    if _profiler is not None:
+        _profiler.disable()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    enabled = False
+
+
+def enable(cprofile: bool = False, memory: bool = False):
+    # Functions are only wrapped while enabled, so an uninstrumented run calls the originals directly
+    global enabled
+    global _profiler
+    if enabled:
+        return
+    reset()
+    for target, extractors in targets.items():
+        name_module, *path, attr = target.split('.')
+        owner = importlib.import_module(name_module)
+        for name in path:
+            owner = getattr(owner, name)
+        func = getattr(owner, attr)
+        _originals.append((owner, attr, func))
+        setattr(owner, attr, instrument(func, target, **extractors))
+    if cprofile:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if memory:
+        tracemalloc.start()
+    enabled = True
+
+
+def instrument(func: Callable, name: str, rows: Callable = None, bytes_read: Callable = None,
+               bytes_written: Callable = None) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        time_begin = time.perf_counter()
+        result = func(*args, **kwargs)
+        record = records.setdefault(name, Record())
+        record.seconds += time.perf_counter() - time_begin
+        record.calls += 1
+        for attr, extract in (('rows', rows), ('bytes_read', bytes_read), ('bytes_written', bytes_written)):
+            if extract is not None:
+                setattr(record, attr, getattr(record, attr) + extract(args, kwargs, result))
+        return result
+    return wrapper
+
+
+def add_timings(name: str, timings_new: Dict[str, float]):
+    timings.setdefault(name, {}).update(timings_new)
+
+
+def reset():
+    # Each enabled run reports only its own calls, even in a reused process
+    global _profiler
+    records.clear()
+    timings.clear()
+    _profiler = None
+
+
+def report(n_top: int = 25) -> Dict:
+    result = {
+        'functions': {name: asdict(record) for name, record in records.items()},
+        'timings': timings,
+    }
+    if _profiler is not None:
+        stream = io.StringIO()
+        stats = pstats.Stats(_profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(n_top)
+        result['cprofile'] = stream.getvalue().splitlines()
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        result['memory'] = {
+            'current': current,
+            'peak': peak,
+            'top': [str(stat) for stat in tracemalloc.take_snapshot().statistics('lineno')[:n_top]],
+        }
+    return result
+
+
+def write_report(filename: str, n_top: int = 25):
+    with open(filename, 'w', encoding='UTF-8') as file:
+        json.dump(report(n_top=n_top), file, indent=2)
@@ -1,7 +1,37 @@
+import numpy as np
+
+import contracts as cntr
 import players as plyr
 import schedule as sched
 import teams
 
+cap_league = 81500000
+
 
 def compute_cap(team: teams.Team, players: plyr.Players):
-    pass
+    return compute_caps(players)[team]
+
+
+def compute_caps(players: plyr.Players) -> np.ndarray:
+    tab = players.table
+    signed = is_signed(players)
+    caps = np.bincount(tab.rights[signed], weights=tab.salary[signed], minlength=teams.registry.n_teams + 1)
+    return caps.astype(np.int64)
+
+
+def is_signed(players: plyr.Players) -> np.ndarray:
+    tab = players.table
+    return ((tab.years > 0) & (tab.salary != cntr.salary_unsigned) & teams.registry.is_nhl(tab.rights)).to_numpy()
+
+
+def project_caps(players: plyr.Players, n_seasons: int = cntr.years_max_league, excluded=None) -> np.ndarray:
+    # Committed salary by team (rows) for this and each following season (columns), without the excluded rows
+    tab = players.table
+    signed = is_signed(players).copy()
+    if excluded is not None:
+        signed[np.asarray(excluded)] = False
+    rights, salaries, years = tab.rights.to_numpy()[signed], tab.salary.to_numpy()[signed], tab.years.to_numpy()[signed]
+    caps = np.zeros((teams.registry.n_teams + 1, n_seasons), dtype=np.int64)
+    for season in range(n_seasons):
+        caps[:, season] = np.bincount(rights, weights=salaries*(years > season), minlength=teams.registry.n_teams + 1)
+    return caps
@@ -1,11 +1,16 @@
-from dataclasses import dataclass
+from __future__ import annotations
+
 import datetime as dt
 #from dateutil.relativedelta import relativedelta
 from enum import IntEnum
 import numpy as np
-import pandas as pd
+from typing import Dict, Iterable
+
+import columnar
+import lazy
+import teams
 
-from teams import Team
+pd = lazy.load('pandas')
 
 N_GAMES_REG = 82
 
@@ -28,46 +33,54 @@ class GameType(IntEnum):
     special = 5
 
 
-@dataclass
 class Game:
-    row: pd.Series = None
+    __slots__ = ('idx', 'schedule')
 
     @property
-    def team_away(self) -> Team:
-        return Team(self.row.team_away)
+    def team_away(self) -> teams.Team:
+        return teams.registry.get_team(self.get('team_away'))
 
     @property
-    def team_home(self) -> Team:
-        return Team(self.row.team_home)
+    def team_home(self) -> teams.Team:
+        return teams.registry.get_team(self.get('team_home'))
 
     @property
     def date(self) -> dt.date:
-        return dt.date(self.row.year, self.row.month, self.row.day)
+        return dt.date(self.get('year'), self.get('month'), self.get('day'))
+
+    def get(self, item: str):
+        return self.schedule.get_value(self.idx, item)
+
+    def set(self, item: str, value):
+        self.schedule.set_value(self.idx, item, value)
 
     def __getattr__(self, item):
+        if item in Game.__slots__:
+            raise AttributeError(item)
         try:
-            return getattr(self.row, item)
+            return self.get(item)
         except KeyError:
             raise AttributeError(item)
 
     def __repr__(self):
-        return f"Game({self.row})"
+        return f"Game({self.idx}/{self.schedule.n_games_max})"
 
     def __setattr__(self, item, value):
-        if item == 'row':
-            super().__setattr__('row', value)
+        if item in Game.__slots__:
+            object.__setattr__(self, item, value)
         else:
             try:
-                setattr(self.row, item, value)
+                self.set(item, value)
             except KeyError:
                 raise AttributeError(item)
 
     def __str__(self):
         return (f"Game('{self.team_home}' vs '{self.team_away}: {self.goals_home}-{self.goals_away} ({self.date}"
-                f", {self.type.name})")
+                f", {GameType(self.type).name})")
 
-    def __init__(self, row, **kwargs):
-        self.row = row
+    def __init__(self, idx: int, schedule: Schedule, **kwargs):
+        self.idx = idx
+        self.schedule = schedule
         invalid = []
         for arg in kwargs:
             if not hasattr(self, arg):
@@ -75,17 +88,19 @@ class Game:
         if invalid:
             raise ValueError(f'Passed invalid init args: {",".join(invalid)}')
         invalid = []
-        for arg, val in kwargs:
+        for arg, val in kwargs.items():
             try:
                 setattr(self, arg, val)
             except AttributeError as e:
-                invalid.append(arg, e)
+                invalid.append((arg, e))
         if invalid:
             raise ValueError(f'Game {self} failed setting attrs with args: {invalid}')
 
 
 class Schedule:
-    table: pd.DataFrame = None
+    # Writable copies of the columns that Game views and set_games have touched; table writes them back when read
+    arrays: Dict[str, np.ndarray] = None
+    _table: pd.DataFrame = None
 
     @staticmethod
     def lines_per_game():
@@ -99,6 +114,10 @@ class Schedule:
     def columns_per_line():
         return tuple(len(x) for x in names_columns)
 
+    @staticmethod
+    def dtypes() -> Dict[str, str]:
+        return {column: 'int64' for columns in names_columns + (('index',),) for column in columns}
+
     @property
     def dates(self):
         dates = pd.to_datetime(self.table[['year', 'month', 'day']])
@@ -116,24 +135,73 @@ class Schedule:
 
     @property
     def n_games_max(self) -> int:
-        return len(self.table)
+        return len(self._table)
+
+    @property
+    def table(self) -> pd.DataFrame:
+        if self.arrays:
+            for column, values in self.arrays.items():
+                self._table[column] = values
+            self.arrays = {}
+        return self._table
+
+    @table.setter
+    def table(self, table: pd.DataFrame):
+        self._table = table
+        self.arrays = {}
+
+    def get_array(self, column: str) -> np.ndarray:
+        values = self.arrays.get(column)
+        if values is None:
+            if column not in self._table.columns:
+                raise KeyError(column)
+            values = self.arrays[column] = self._table[column].to_numpy(copy=True)
+        return values
+
+    def get_game(self, idx: int) -> Game:
+        return Game(idx, self)
+
+    def get_value(self, idx: int, item: str):
+        return self.get_array(item)[idx]
 
     def set_game(self, pid: int, game: Game):
-        self.table.iloc[pid] = game.row
+        if game.schedule is self and game.idx == pid:
+            return
+        self.set_games([pid], **{
+            column: [game.get(column)] for column in game.schedule.table.columns if column != 'index'
+        })
+
+    def set_games(self, indices, **columns):
+        invalid = [column for column in columns if column not in self._table.columns]
+        if invalid:
+            raise ValueError(f'Passed invalid columns: {",".join(invalid)}')
+        indices = np.asarray(indices, dtype=np.int64)
+        for column, values in columns.items():
+            self.get_array(column)[indices] = values
+
+    def set_value(self, idx: int, item: str, value):
+        self.get_array(item)[idx] = value
 
     def write(self, filename):
         if filename[-3:] == 'csv':
             self.write_csv(filename, index=False, encoding='cp1252')
         elif filename[-3:] == 'ehm':
             self.write_ehm(filename)
+        elif columnar.is_columnar(filename):
+            self.write_columnar(filename)
         else:
-            ValueError(f'Unknown extension for output filename={filename}')
+            raise ValueError(f'Unknown extension for output filename={filename}')
+
+    def write_columnar(self, filename):
+        columnar.write(self.table, filename, Schedule.dtypes())
 
     def write_csv(self, filename, **kwargs):
         self.table.to_csv(filename, **kwargs)
 
     def write_ehm(self, filename):
         with open(filename, 'w', encoding='cp1252') as file:
+            # The reader skips this line, as EHM writes the number of games there
+            file.write(f' {self.n_games_max} \n')
             tab = self.table
             for idx, row in enumerate(tab.itertuples()):
                 for idx_col, cols in enumerate(names_columns):
@@ -142,10 +210,14 @@ class Schedule:
                         file.write(f'{string}\n')
                     except Exception as err:
                         print(f'{err} from game:')
-                        print(Game(tab.iloc[idx]))
-
-    def __init__(self, filename):
-        with open(filename, 'r') as file:
+                        print(Game(idx, self))
+
+    def __init__(self, filename, columns: Iterable[str] = None):
+        projection = None if columns is None else list(columns)
+        if columnar.is_columnar(filename):
+            self.table = columnar.read(filename, Schedule.dtypes(), columns=projection)
+            return
+        with open(filename, 'r', encoding='cp1252') as file:
             if filename[-3:] == 'ehm':
                 lines = file.readlines()
                 n_lines = len(lines)
@@ -171,6 +243,7 @@ class Schedule:
                         idx_begin += n_columns_row
                     rows[idx_game] = row
                 table = pd.DataFrame(rows)
+                table.columns = [y for x in names_columns for y in x] + ['index']
                 self.table = table
             elif filename[-3:] == 'csv':
                 tab = pd.read_csv(filename, encoding='cp1252')
@@ -179,3 +252,5 @@ class Schedule:
                 self.table = tab
             else:
                 raise ValueError(f'Unknown extension for filename={filename}')
+        if projection is not None:
+            self.table = self.table[projection]
@@ -0,0 +1,76 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+import schedule as sched
+
+# Header, then per game: day month year team_home team_away status type, then goals_home goals_away
+lines_ehm = [
+    ' 3 \n',
+    ' 5  10  2021  1  2  1  1 \n', ' 3  2 \n',
+    ' 6  10  2021  3  4  2  1 \n', ' 1  2 \n',
+    ' 7  10  2021  2  3  0  1 \n', ' 0  0 \n',
+]
+
+
+@pytest.fixture
+def schedule(tmp_path):
+    filename = tmp_path / 'schedule.ehm'
+    filename.write_text(''.join(lines_ehm), encoding='cp1252')
+    return sched.Schedule(str(filename))
+
+
+def test_game_read(schedule, registry):
+    game = schedule.get_game(1)
+    assert (game.goals_home, game.goals_away) == (1, 2)
+    assert game.date == dt.date(2021, 10, 6)
+    assert (game.team_home.value, game.team_away.value) == (3, 4)
+    assert sched.GameStatus(game.status) == sched.GameStatus.overtime
+    with pytest.raises(AttributeError):
+        game.goals_total
+
+
+def test_game_write(tmp_path, schedule):
+    game = schedule.get_game(2)
+    game.goals_home, game.goals_away = 4, 1
+    game.status = sched.GameStatus.regulation.value
+    assert schedule.table.goals_home.tolist() == [3, 1, 4]
+    assert schedule.table.status.tolist() == [1, 2, 1]
+    with pytest.raises(AttributeError):
+        game.goals_total = 5
+    filename = tmp_path / 'schedule_out.ehm'
+    schedule.write_ehm(str(filename))
+    lines = filename.read_text(encoding='cp1252').splitlines(keepends=True)
+    assert lines[5:] == [' 7  10  2021  2  3  1  1 \n', ' 4  1 \n']
+    assert lines[:5] == lines_ehm[:5]
+
+
+def test_game_init(schedule):
+    game = sched.Game(0, schedule, goals_home=5)
+    assert schedule.get_value(0, 'goals_home') == 5
+    with pytest.raises(ValueError):
+        sched.Game(0, schedule, goals_total=5)
+
+
+def test_set_games(tmp_path, schedule):
+    schedule.set_games([0, 2], day=np.array([12, 14]), month=11, goals_home=[6, 7])
+    assert schedule.get_game(2).date == dt.date(2021, 11, 14)
+    with pytest.raises(ValueError):
+        schedule.set_games([0], goals_total=[1])
+    filename = tmp_path / 'schedule_out.ehm'
+    schedule.write_ehm(str(filename))
+    assert filename.read_text(encoding='cp1252').splitlines(keepends=True) == [
+        ' 3 \n',
+        ' 12  11  2021  1  2  1  1 \n', ' 6  2 \n',
+        ' 6  10  2021  3  4  2  1 \n', ' 1  2 \n',
+        ' 14  11  2021  2  3  0  1 \n', ' 7  0 \n',
+    ]
+    schedule_out = sched.Schedule(str(filename))
+    assert schedule_out.table.equals(schedule.table)
+
+
+def test_set_game(schedule):
+    schedule.set_game(1, schedule.get_game(0))
+    assert schedule.table.iloc[1].drop('index').equals(schedule.table.iloc[0].drop('index'))
+    assert schedule.table['index'].tolist() == [0, 1, 2]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import numpy as np
+
+import lazy
+import players as plyr
+import teams
+
+pd = lazy.load('pandas')
+
+
+def check_team(scouting: np.ndarray, team: int):
+    if not 1 <= team <= scouting.shape[1]:
+        raise ValueError(f'Team id={team} has no scouting column; must be in [1, {scouting.shape[1]}]')
+
+
+def get_coverage(scouting: np.ndarray, threshold: int = 1, rows=None) -> pd.DataFrame:
+    # Per team: how many of the players (all, or only rows) it has scouted to at least threshold
+    values = scouting if rows is None else scouting[np.asarray(rows)]
+    scouted = values >= threshold
+    n_players = len(values)
+    return pd.DataFrame({
+        'team': np.arange(1, values.shape[1] + 1),
+        'n_scouted': scouted.sum(axis=0),
+        'fraction': scouted.sum(axis=0)/max(n_players, 1),
+        'level_mean': values.mean(axis=0) if n_players > 0 else np.zeros(values.shape[1]),
+    })
+
+
+def get_n_teams(scouting: np.ndarray, threshold: int = 1) -> np.ndarray:
+    # How many teams have scouted each player to at least threshold
+    return np.count_nonzero(scouting >= threshold, axis=1)
+
+
+def get_prospects(players: plyr.Players) -> np.ndarray:
+    return np.flatnonzero(players.table.rights.to_numpy() == teams.Team.Undrafted.value)
+
+
+def get_scouted(scouting: np.ndarray, team: int, threshold: int = 1, rows=None) -> np.ndarray:
+    # Rows (of all, or only rows) that team has scouted to at least threshold, best scouted first
+    check_team(scouting, team)
+    rows = np.arange(len(scouting)) if rows is None else np.asarray(rows)
+    rows = rows[scouting[rows, team - 1] >= threshold]
+    return rows[np.argsort(-scouting[rows, team - 1].astype(np.int64), kind='stable')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report each team's scouting of draft prospects")
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--config_teams', required=True, type=str)
+    parser.add_argument('--all', action='store_true', help='Report on all players, not only undrafted prospects')
+    parser.add_argument('--output', default=None, type=str, help='Path to write the coverage per team to as csv')
+    parser.add_argument('--team', default=None, type=str, help="Acronym of a team to list the scouted players of")
+    parser.add_argument('--threshold', default=1, type=int, help='Minimum scouting level to count as scouted')
+    args = parser.parse_args()
+
+    registry = teams.read_teams(args.config_teams)
+    players = plyr.Players(args.players)
+    scouting = players.get_scouting()
+    rows = None if args.all else get_prospects(players)
+    coverage = get_coverage(scouting, threshold=args.threshold, rows=rows)
+    if args.output is not None:
+        coverage.to_csv(args.output, index=False)
+    n_players = players.n_players if rows is None else len(rows)
+    print(f"Scouting coverage of {n_players} {'players' if args.all else 'prospects'} at level >= {args.threshold}:")
+    for row in coverage.itertuples():
+        if row.team in registry.teaminfos:
+            print(f"{registry.teaminfos[row.team].acronym}: {row.n_scouted} ({100*row.fraction:.1f}%),"
+                  f" mean level {row.level_mean:.2f}")
+    if args.team is not None:
+        team = registry.by_acronym(args.team)
+        tab = players.table
+        print(f"{team.name} scouted:")
+        for row in get_scouted(scouting, team.value, threshold=args.threshold, rows=rows):
+            print(f"  {tab.name_first.iat[row]} {tab.name_last.iat[row]} ({plyr.Position(tab.position.iat[row]).name})"
+                  f" level {scouting[row, team.value - 1]}, pot {tab.pot.iat[row]}")
@@ -0,0 +1,190 @@
+import argparse
+import functools
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import numpy as np
+import os
+from typing import Callable, Dict
+from urllib.parse import parse_qsl, urlsplit
+
+import lazy
+import players as plyr
+import salary_cap
+import schedule as sched
+import teams
+
+pd = lazy.load('pandas')
+
+columns_default = ('name_first', 'name_last', 'position', 'team', 'rights', 'salary', 'years', 'pot', 'con')
+cache_size_default = 1024
+
+# Endpoints (all GET, all JSON):
+# /players?name=<full or last name>&team=<team>&rights=<team>&<column>=<value>&<column>_min=..&<column>_max=..
+#   &columns=<comma-separated columns>&limit=<n>
+# /players/<row>
+# /teams
+# /teams/<team>
+# /schedule?team=<team>
+# Teams can be given by acronym (including farm acronyms) or id
+# Names match case, accent and punctuation insensitively, as names.normalize
+
+
+class Store:
+    # A loaded save; everything is reloaded, and cached responses dropped, when any of its files change
+    filenames: Dict[str, str] = None
+    mtimes: Dict[str, float] = None
+    players: plyr.Players = None
+    registry: teams.TeamRegistry = None
+    respond_cached: Callable = None
+    schedule: sched.Schedule = None
+
+    def check(self):
+        mtimes = {name: os.path.getmtime(filename) for name, filename in self.filenames.items()}
+        if mtimes != self.mtimes:
+            self.load()
+            self.mtimes = mtimes
+
+    def get_team(self, value: str) -> int:
+        try:
+            return self.registry.get_team(int(value)).value if value.isdigit() else self.registry.by_acronym(
+                value).value
+        except KeyError:
+            raise ValueError(f'Unknown team={value}') from None
+
+    def get_team_id(self, value: str) -> int:
+        # As get_team, but farm team ids and acronyms stay farm team ids, as in the players' team column
+        id_team = self.get_team(value)
+        if value.isdigit():
+            return int(value)
+        teaminfo = self.registry.teaminfos.get(id_team)
+        return teaminfo.id_farm if teaminfo is not None and value == teaminfo.acronym_farm else id_team
+
+    def load(self):
+        self.registry = teams.read_teams(self.filenames['config_teams'])
+        self.players = plyr.Players(self.filenames['players'])
+        self.schedule = sched.Schedule(self.filenames['schedule']) if 'schedule' in self.filenames else None
+        self.players.get_name_index()
+        self.respond_cached.cache_clear()
+
+    def query(self, path: str, params: Dict[str, str]) -> str:
+        self.check()
+        return self.respond_cached(path, tuple(sorted(params.items())))
+
+    def query_players(self, params: Dict[str, str]) -> str:
+        params = dict(params)
+        tab = self.players.table
+        columns = params.pop('columns').split(',') if 'columns' in params else list(columns_default)
+        limit = int(params.pop('limit')) if 'limit' in params else None
+        rows = np.arange(len(tab))
+        if 'name' in params:
+            rows = self.players.get_name_index().find(params.pop('name'))
+        selected = np.ones(len(rows), dtype=bool)
+        for param, value in params.items():
+            if param in ('team', 'rights'):
+                # Rights are always held by the parent team, but farm players are on the farm team
+                id_team = self.get_team_id(value) if param == 'team' else self.get_team(value)
+                selected &= tab[param].to_numpy()[rows] == id_team
+                continue
+            column, bound = param, None
+            if param.endswith(('_min', '_max')) and param not in tab.columns:
+                column, bound = param[:-4], param[-3:]
+            if column not in tab.columns:
+                raise ValueError(f'Unknown filter={param}')
+            values = tab[column].to_numpy()[rows]
+            if bound is None:
+                selected &= values == (int(value) if pd.api.types.is_numeric_dtype(tab[column]) else value)
+            else:
+                value = float(value)
+                selected &= (values >= value) if bound == 'min' else (values <= value)
+        unknown = [column for column in columns if column not in tab.columns]
+        if unknown:
+            raise ValueError(f'Unknown columns={unknown}')
+        rows = rows[selected][:limit]
+        result = tab.iloc[rows][columns]
+        result.insert(0, 'row', rows)
+        return result.to_json(orient='records')
+
+    def respond(self, path: str, params: Dict[str, str]) -> str:
+        parts = [part for part in path.split('/') if part]
+        if parts == ['players']:
+            return self.query_players(params)
+        if len(parts) == 2 and parts[0] == 'players':
+            row = int(parts[1])
+            if not 0 <= row < self.players.n_players:
+                raise KeyError(f'No player in row={row}')
+            return self.players.table.iloc[[row]].to_json(orient='records')[1:-1]
+        if parts and parts[0] == 'teams' and len(parts) <= 2:
+            caps = salary_cap.compute_caps(self.players)
+            ids = [self.get_team(parts[1])] if len(parts) == 2 else sorted(self.registry.teaminfos)
+            result = []
+            for id_team in ids:
+                teaminfo = self.registry.teaminfos[id_team]
+                result.append({'id': id_team, 'acronym': teaminfo.acronym, 'name': teaminfo.name,
+                               'acronym_farm': teaminfo.acronym_farm, 'cap': int(caps[id_team]),
+                               'cap_space': int(salary_cap.cap_league - caps[id_team])})
+            if len(parts) == 2:
+                result = result[0]
+                result['roster'] = json.loads(self.query_players({'rights': parts[1]}))
+            return json.dumps(result)
+        if parts == ['schedule'] and self.schedule is not None:
+            tab = self.schedule.table
+            if 'team' in params:
+                id_team = self.get_team(params['team'])
+                tab = tab[(tab.team_home == id_team) | (tab.team_away == id_team)]
+            return tab.to_json(orient='records')
+        raise KeyError(f'Unknown path={path}')
+
+    def __init__(self, filename_players: str, filename_config_teams: str, filename_schedule: str = None,
+                 cache_size: int = cache_size_default):
+        # Least recently used responses are dropped once cache_size are cached
+        self.respond_cached = functools.lru_cache(maxsize=cache_size)(
+            lambda path, params: self.respond(path, dict(params)))
+        self.filenames = {'players': filename_players, 'config_teams': filename_config_teams}
+        if filename_schedule is not None:
+            self.filenames['schedule'] = filename_schedule
+        self.mtimes = {}
+        self.check()
+
+
+class Handler(BaseHTTPRequestHandler):
+    store: Store = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            status, response = 200, self.store.query(url.path, dict(parse_qsl(url.query)))
+        except KeyError as err:
+            status, response = 404, json.dumps({'error': str(err.args[0] if err.args else err)})
+        except ValueError as err:
+            status, response = 400, json.dumps({'error': str(err)})
+        except Exception as err:
+            status, response = 500, json.dumps({'error': f'{type(err).__name__}: {err}'})
+        body = response.encode('UTF-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(store: Store, port: int = 8000, host: str = '127.0.0.1') -> HTTPServer:
+    handler = type('StoreHandler', (Handler,), {'store': store})
+    return HTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve JSON queries over a league save on localhost")
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--config_teams', required=True, type=str)
+    parser.add_argument('--schedule', default=None, type=str)
+    parser.add_argument('--cache_size', default=cache_size_default, type=int, help='Responses to keep cached')
+    parser.add_argument('--port', default=8000, type=int)
+    args = parser.parse_args()
+
+    store = Store(args.players, args.config_teams, filename_schedule=args.schedule, cache_size=args.cache_size)
+    server = serve(store, port=args.port)
+    print(f"Serving {args.players} on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
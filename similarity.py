@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+import numpy as np
+from typing import Dict, Iterable, Tuple
+
+import lazy
+import players as plyr
+import salary_cap
+import teams
+
+pd = lazy.load('pandas')
+
+columns_ratings = plyr.names_columns[0] + plyr.names_columns[1][:2]
+columns_ceilings = plyr.names_columns[16]
+columns_features = columns_ratings + columns_ceilings + ('age',)
+statuses = ('signed', 'unsigned', 'ufa')
+
+
+def get_status_mask(players: plyr.Players, status: str) -> np.ndarray:
+    if status == 'signed':
+        return salary_cap.is_signed(players)
+    if status == 'unsigned':
+        return ~salary_cap.is_signed(players)
+    if status == 'ufa':
+        return players.table.rights.to_numpy() == teams.Team.UFA.value
+    raise ValueError(f'Unknown contract status={status}; must be one of {statuses}')
+
+
+class SimilarityIndex:
+    # Standardized ratings, ceilings and age per player, plus a one-hot position scaled so that players at different
+    # positions are weight_position apart in squared distance; neighbours are found by blocked brute force
+    features: np.ndarray = None
+    means: np.ndarray = None
+    norms: np.ndarray = None
+    players: plyr.Players = None
+    positions: np.ndarray = None
+    scale_position: float = None
+    stds: np.ndarray = None
+
+    def get_candidates(self, positions: Iterable[int] = None, status: str = None) -> np.ndarray:
+        candidates = np.ones(len(self.features), dtype=bool)
+        if positions is not None:
+            candidates &= np.isin(self.positions, [int(position) for position in positions])
+        if status is not None:
+            candidates &= get_status_mask(self.players, status)
+        return candidates
+
+    def get_features(self, values: Dict[str, float], position: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        # An ad-hoc query vector and which of its dimensions were given; the others don't count towards distance
+        unknown = [column for column in values if column not in columns_features]
+        if unknown:
+            raise ValueError(f'Unknown similarity features={unknown}; must be among {columns_features}')
+        n_features = len(columns_features)
+        vector = np.zeros(n_features + len(plyr.Position), dtype=np.float32)
+        given = np.zeros_like(vector, dtype=bool)
+        for idx, column in enumerate(columns_features):
+            if column in values:
+                vector[idx] = (values[column] - self.means[idx])/self.stds[idx]
+                given[idx] = True
+        if position is not None:
+            vector[n_features + int(position)] = self.scale_position
+            given[n_features:] = True
+        return vector, given
+
+    def query(self, rows, k: int = 10, positions: Iterable[int] = None, status: str = None,
+              block_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+        # The k nearest other players to each of rows, nearest first, as (rows, distances) of shape (len(rows), k)
+        rows = np.asarray(rows, dtype=np.int64)
+        return self.query_vectors(self.features[rows], k=k, positions=positions, status=status, excluded=rows,
+                                  block_size=block_size)
+
+    def query_player(self, row: int, k: int = 10, positions: Iterable[int] = None, status: str = None,
+                     columns: Iterable[str] = ('name_first', 'name_last', 'position', 'rights', 'salary', 'years')
+                     ) -> pd.DataFrame:
+        neighbours, distances = self.query([row], k=k, positions=positions, status=status)
+        return self.to_frame(neighbours[0], distances[0], columns)
+
+    def query_values(self, values: Dict[str, float], position: int = None, k: int = 10,
+                     positions: Iterable[int] = None, status: str = None) -> Tuple[np.ndarray, np.ndarray]:
+        vector, given = self.get_features(values, position=position)
+        features = self.features[:, given]
+        candidates = self.get_candidates(positions=positions, status=status)
+        return self._nearest(vector[np.newaxis, given], features, np.sum(features**2, axis=1), candidates, k=k)
+
+    def query_vectors(self, vectors: np.ndarray, k: int = 10, positions: Iterable[int] = None, status: str = None,
+                      excluded=None, block_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+        # Queries in full feature space; excluded[i], if given, is left out of the neighbours of vectors[i]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        candidates = self.get_candidates(positions=positions, status=status)
+        k = min(k, int(np.sum(candidates)))
+        neighbours = np.full((len(vectors), k), -1, dtype=np.int64)
+        distances = np.full((len(vectors), k), np.inf, dtype=np.float32)
+        for begin in range(0, len(vectors), block_size):
+            end = min(begin + block_size, len(vectors))
+            neighbours[begin:end], distances[begin:end] = self._nearest(
+                vectors[begin:end], self.features, self.norms, candidates, k=k,
+                excluded=None if excluded is None else excluded[begin:end])
+        return neighbours, distances
+
+    def to_frame(self, neighbours: np.ndarray, distances: np.ndarray, columns: Iterable[str]) -> pd.DataFrame:
+        found = neighbours >= 0
+        result = self.players.table.iloc[neighbours[found]][list(columns)].reset_index(drop=True)
+        result.insert(0, 'row', neighbours[found])
+        result['distance'] = distances[found]
+        return result
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, features: np.ndarray, norms: np.ndarray, candidates: np.ndarray, k: int,
+                 excluded: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, int(np.sum(candidates)))
+        if k == 0:
+            return np.zeros((len(vectors), 0), dtype=np.int64), np.zeros((len(vectors), 0), dtype=np.float32)
+        distances = norms[np.newaxis, :] - 2*(vectors @ features.T) + np.sum(vectors**2, axis=1)[:, np.newaxis]
+        distances[:, ~candidates] = np.inf
+        if excluded is not None:
+            distances[np.arange(len(vectors)), excluded] = np.inf
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < distances.shape[1] else np.argsort(
+            distances, axis=1)
+        dists = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(dists, axis=1, kind='stable')
+        nearest, dists = np.take_along_axis(nearest, order, axis=1), np.take_along_axis(dists, order, axis=1)
+        # Fewer than k candidates once excluded, and rounding below zero for (near) duplicates
+        nearest[~np.isfinite(dists)] = -1
+        return nearest, np.sqrt(np.maximum(dists, 0.))
+
+    def __init__(self, players: plyr.Players, date: datetime = None, weight_position: float = 4.):
+        if date is None:
+            date = datetime.now()
+        self.players = players
+        tab = players.table
+        ages = ((pd.Timestamp(date) - players.get_birthdates()).dt.days/365.25).to_numpy()
+        values = np.column_stack([tab[list(columns_ratings + columns_ceilings)].to_numpy(dtype=np.float64), ages])
+        self.means = np.nanmean(values, axis=0)
+        self.stds = np.nanstd(values, axis=0)
+        self.stds[~(self.stds > 0)] = 1.
+        standardized = np.nan_to_num((values - self.means)/self.stds)
+        self.positions = tab.position.to_numpy()
+        self.scale_position = np.sqrt(weight_position/2)
+        onehot = np.zeros((len(tab), len(plyr.Position)))
+        onehot[np.arange(len(tab)), self.positions] = self.scale_position
+        self.features = np.ascontiguousarray(np.column_stack([standardized, onehot]), dtype=np.float32)
+        self.norms = np.sum(self.features**2, axis=1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="List the most similar players by ratings, ceilings, age and position")
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--config_teams', required=True, type=str)
+    parser.add_argument('--free_agents', action='store_true', help='Find comparables for every UFA')
+    parser.add_argument('--k', default=10, type=int)
+    parser.add_argument('--name', default=None, type=str, help='Full name of a player to find comparables for')
+    parser.add_argument('--output', default=None, type=str, help='Path to write all comparables to as csv')
+    parser.add_argument('--position', default=None, type=str, nargs='+', choices=[x.name for x in plyr.Position])
+    parser.add_argument('--status', default=None, type=str, choices=statuses, help='Contract status of comparables')
+    args = parser.parse_args()
+    if (args.name is None) == (not args.free_agents):
+        parser.error('Pass exactly one of --name or --free_agents')
+
+    teams.read_teams(args.config_teams)
+    players = plyr.Players(args.players)
+    index = SimilarityIndex(players)
+    positions = None if args.position is None else [plyr.Position[name] for name in args.position]
+    if args.name is not None:
+        rows = np.array([players.find_player_by_fullname(args.name)])
+    else:
+        rows = np.flatnonzero(get_status_mask(players, 'ufa'))
+    neighbours, distances = index.query(rows, k=args.k, positions=positions, status=args.status)
+    tab = players.table
+    comparables = []
+    for row, neighbours_row, distances_row in zip(rows, neighbours, distances):
+        print(f"{tab.name_first.iat[row]} {tab.name_last.iat[row]} ({plyr.Position(tab.position.iat[row]).name}):")
+        result = index.to_frame(neighbours_row, distances_row, ('name_first', 'name_last', 'position', 'salary',
+                                                                'years'))
+        for comparable in result.itertuples():
+            print(f"  {comparable.name_first} {comparable.name_last} ({plyr.Position(comparable.position).name})"
+                  f" {comparable.salary}x{comparable.years} distance {comparable.distance:.2f}")
+        result.insert(0, 'query', row)
+        comparables.append(result)
+    if args.output is not None:
+        pd.concat(comparables, ignore_index=True).to_csv(args.output, index=False)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from typing import Sequence, Tuple
+
+import lazy
+import players as plyr
+import schedule as sched
+import teams
+
+pd = lazy.load('pandas')
+
+# Used until enough games have been played to estimate them from the schedule
+prob_home_default = 0.55
+prob_overtime_default = 0.23
+n_games_fit = 100
+
+
+@dataclass
+class Season:
+    # Remaining games and current standings by team index (team id - 1); plain arrays so that it pickles cheaply
+    divisions: np.ndarray
+    points: np.ndarray
+    probs_home: np.ndarray
+    prob_overtime: float
+    teams_away: np.ndarray
+    teams_home: np.ndarray
+    wins: np.ndarray
+    n_division: int = 0
+    n_playoff: int = 16
+
+    @property
+    def n_teams(self) -> int:
+        return len(self.points)
+
+
+def get_playoffs(points: np.ndarray, wins: np.ndarray, divisions: np.ndarray, n_playoff: int, n_division: int,
+                 rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    # League ranks (0 is first) by points, then wins, then a coin flip, and who makes the playoffs: the top n_division
+    # of each division, then the best of the rest up to n_playoff
+    order = np.lexsort((rng.random(points.shape), -wins, -points), axis=-1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(points.shape[-1])[np.newaxis, :], axis=-1)
+    playoffs = np.zeros(points.shape, dtype=bool)
+    if n_division > 0:
+        for division in np.unique(divisions):
+            members = np.flatnonzero(divisions == division)
+            ranks_division = np.argsort(np.argsort(ranks[:, members], axis=-1), axis=-1)
+            playoffs[:, members] = ranks_division < n_division
+    # Remaining spots go down the league ranking, skipping teams already in
+    in_order = np.take_along_axis(playoffs, order, axis=-1)
+    n_left = n_playoff - in_order.sum(axis=-1, keepdims=True)
+    wildcards = ~in_order & (np.cumsum(~in_order, axis=-1) <= n_left)
+    np.put_along_axis(playoffs, order, in_order | wildcards, axis=-1)
+    return ranks, playoffs
+
+
+def get_season(players: plyr.Players, schedule: sched.Schedule, registry: teams.TeamRegistry, n_dressed: int = 20,
+               scale: float = 0.1, n_playoff: int = 16, n_division: int = 0) -> Season:
+    n_teams = registry.n_teams
+    tab = schedule.table
+    regular = tab.type.to_numpy() == sched.GameType.regpre.value
+    status = tab.status.to_numpy()
+    played = regular & (status != sched.GameStatus.unplayed.value)
+    standings = get_standings(schedule, n_teams)
+    remaining = regular & (status == sched.GameStatus.unplayed.value)
+    teams_home, teams_away = tab.team_home.to_numpy()[remaining] - 1, tab.team_away.to_numpy()[remaining] - 1
+    goals_home, goals_away = tab.goals_home.to_numpy()[played], tab.goals_away.to_numpy()[played]
+    decided = goals_home != goals_away
+    prob_home, prob_overtime = prob_home_default, prob_overtime_default
+    if np.sum(decided) >= n_games_fit:
+        prob_home = np.mean(goals_home[decided] > goals_away[decided])
+        prob_overtime = np.mean(status[played] == sched.GameStatus.overtime.value)
+    strengths = get_strengths(players, n_teams, n_dressed=n_dressed)
+    # Logistic in the strength difference, offset so that equal teams win at home at prob_home
+    logits = scale*(strengths[teams_home] - strengths[teams_away]) + np.log(prob_home/(1 - prob_home))
+    divisions = np.array([registry.teaminfos[idx + 1].division for idx in range(n_teams)])
+    return Season(
+        divisions=divisions, points=standings.points.to_numpy(), probs_home=1/(1 + np.exp(-logits)),
+        prob_overtime=float(prob_overtime), teams_away=teams_away, teams_home=teams_home,
+        wins=standings.wins.to_numpy(), n_division=n_division, n_playoff=n_playoff,
+    )
+
+
+def get_standings(schedule: sched.Schedule, n_teams: int) -> pd.DataFrame:
+    # Per team index from played regular season games: 2 points a win, 1 an overtime loss or a tie
+    tab = schedule.table
+    tab = tab[(tab.type == sched.GameType.regpre.value) & (tab.status != sched.GameStatus.unplayed.value)]
+    overtime = (tab.status == sched.GameStatus.overtime.value).to_numpy()
+    standings = pd.DataFrame(0, index=pd.RangeIndex(n_teams), columns=['gp', 'wins', 'losses', 'losses_ot', 'ties'])
+    for side, goals_for, goals_against in (('home', tab.goals_home, tab.goals_away),
+                                           ('away', tab.goals_away, tab.goals_home)):
+        ids = tab[f'team_{side}'].to_numpy() - 1
+        won, lost = (goals_for > goals_against).to_numpy(), (goals_for < goals_against).to_numpy()
+        for column, mask in (('gp', np.ones(len(ids), dtype=bool)), ('wins', won), ('losses', lost & ~overtime),
+                             ('losses_ot', lost & overtime), ('ties', ~won & ~lost)):
+            standings[column] += np.bincount(ids[mask], minlength=n_teams)
+    standings['points'] = 2*standings.wins + standings.losses_ot + standings.ties
+    return standings
+
+
+def get_strengths(players: plyr.Players, n_teams: int, n_dressed: int = 20) -> np.ndarray:
+    # Mean overall of each NHL team's best n_dressed rostered players; farm teams don't count
+    tab = players.table
+    rostered = pd.DataFrame({'team': tab.team.to_numpy(), 'overall': players.get_overall(simple=False).to_numpy()})
+    rostered = rostered[(rostered.team >= 1) & (rostered.team <= n_teams)].sort_values(
+        ['team', 'overall'], ascending=[True, False])
+    dressed = rostered[rostered.groupby('team').cumcount() < n_dressed]
+    strengths = dressed.groupby('team').overall.mean().reindex(np.arange(1, n_teams + 1))
+    return strengths.fillna(dressed.overall.mean()).to_numpy()
+
+
+def parse_n_sims(string: str) -> int:
+    n_sims = int(string)
+    if n_sims <= 0:
+        raise argparse.ArgumentTypeError(f'n_sims={n_sims} must be positive')
+    return n_sims
+
+
+def simulate(season: Season, n_sims: int = 10000, n_processes: int = None, chunk_size: int = 1000,
+             seed: int = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Final points, league ranks and playoff berths as (n_sims, n_teams) arrays
+    # Each chunk has its own seed, so results for a seed don't depend on n_processes
+    if n_sims <= 0:
+        raise ValueError(f'n_sims={n_sims} must be positive')
+    n_chunks = -(-n_sims//chunk_size)
+    sizes = [min(chunk_size, n_sims - idx*chunk_size) for idx in range(n_chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    if n_processes == 1 or n_chunks == 1:
+        results = list(map(simulate_chunk, [season]*n_chunks, sizes, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=n_processes) as executor:
+            results = list(executor.map(simulate_chunk, [season]*n_chunks, sizes, seeds))
+    return tuple(np.concatenate(arrays) for arrays in zip(*results))
+
+
+def simulate_chunk(season: Season, n_sims: int, seed) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Runs in a worker process; every remaining game of every sim is drawn at once
+    rng = np.random.default_rng(seed)
+    n_games = len(season.teams_home)
+    wins_home = rng.random((n_sims, n_games)) < season.probs_home
+    overtime = rng.random((n_sims, n_games)) < season.prob_overtime
+    home, away = np.zeros((n_games, season.n_teams), dtype=np.float32), np.zeros(
+        (n_games, season.n_teams), dtype=np.float32)
+    home[np.arange(n_games), season.teams_home] = 1
+    away[np.arange(n_games), season.teams_away] = 1
+    points_home = (2*wins_home + (overtime & ~wins_home)).astype(np.float32)
+    points_away = (2*~wins_home + (overtime & wins_home)).astype(np.float32)
+    points = season.points + np.rint(points_home @ home + points_away @ away).astype(np.int64)
+    wins = season.wins + np.rint(wins_home.astype(np.float32) @ home + (~wins_home).astype(np.float32) @ away).astype(
+        np.int64)
+    ranks, playoffs = get_playoffs(points, wins, season.divisions, season.n_playoff, season.n_division, rng)
+    return points.astype(np.int16), ranks.astype(np.int8), playoffs
+
+
+def summarize(season: Season, points: np.ndarray, ranks: np.ndarray, playoffs: np.ndarray,
+              registry: teams.TeamRegistry, percentiles: Sequence[int] = (10, 50, 90)) -> pd.DataFrame:
+    summary = pd.DataFrame({
+        'team': [registry.teaminfos[idx + 1].acronym for idx in range(season.n_teams)],
+        'points_now': season.points,
+        'points_mean': points.mean(axis=0),
+        'points_std': points.std(axis=0),
+    })
+    for percentile, values in zip(percentiles, np.percentile(points, percentiles, axis=0)):
+        summary[f'points_p{percentile}'] = values
+    summary['rank_mean'] = ranks.mean(axis=0) + 1
+    summary['playoffs'] = playoffs.mean(axis=0)
+    return summary.sort_values(['playoffs', 'points_mean'], ascending=False, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate the rest of the regular season for playoff odds")
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--config_teams', required=True, type=str)
+    parser.add_argument('--schedule', required=True, type=str)
+    parser.add_argument('--n_division', default=0, type=int, help='Playoff spots guaranteed to each division leader')
+    parser.add_argument('--n_dressed', default=20, type=int, help='Best players per roster counted for strength')
+    parser.add_argument('--n_playoff', default=16, type=int)
+    parser.add_argument('--n_processes', default=None, type=int)
+    parser.add_argument('--n_sims', default=10000, type=parse_n_sims)
+    parser.add_argument('--output', default=None, type=str, help='Path to write the summary to as csv')
+    parser.add_argument('--scale', default=0.1, type=float, help='Log-odds of winning per point of strength')
+    parser.add_argument('--seed', default=None, type=int)
+    args = parser.parse_args()
+
+    registry = teams.read_teams(args.config_teams)
+    season = get_season(plyr.Players(args.players), sched.Schedule(args.schedule), registry,
+                        n_dressed=args.n_dressed, scale=args.scale, n_playoff=args.n_playoff,
+                        n_division=args.n_division)
+    print(f"Simulating {len(season.teams_home)} remaining games {args.n_sims} times")
+    summary = summarize(season, *simulate(season, n_sims=args.n_sims, n_processes=args.n_processes,
+                                          seed=args.seed), registry=registry)
+    if args.output is not None:
+        summary.to_csv(args.output, index=False)
+    for row in summary.itertuples():
+        print(f"{row.team}: {row.points_now} now, {row.points_mean:.1f} +/- {row.points_std:.1f} projected,"
+              f" rank {row.rank_mean:.1f}, playoffs {100*row.playoffs:.1f}%")
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Dict
+import hashlib
+import numpy as np
+from typing import Dict, Type
 
 N_TEAMS = 30
 sentinel = "---------------- End of NHL teams ----------------"
@@ -25,35 +27,120 @@ class TeamInfo:
     id_farm: int
 
 
+class TeamRegistry:
+    Team: Type[IntEnum] = Team
+    n_teams: int = N_TEAMS
+    teaminfos: Dict[int, TeamInfo] = None
+
+    def by_acronym(self, acronym: str) -> Team:
+        return self._by_acronym[acronym]
+
+    def by_farm_id(self, id_farm: int) -> Team:
+        return self._by_farm_id[id_farm]
+
+    def by_id(self, id_team: int) -> Team:
+        return self.Team(id_team)
+
+    def by_name(self, name: str) -> Team:
+        return self._by_name[name]
+
+    def get_farm_id(self, team: int) -> int:
+        return team + self.n_teams
+
+    def get_parent_ids(self, values) -> np.ndarray:
+        return self._ids_parent[np.asarray(values)]
+
+    def get_team(self, value: int) -> Team:
+        try:
+            return self._by_value[value]
+        except KeyError:
+            raise ValueError(f"{value} is not a valid {self.Team.__name__}") from None
+
+    def is_farm(self, values) -> np.ndarray:
+        return self._is_farm[np.asarray(values)]
+
+    def is_nhl(self, values) -> np.ndarray:
+        return self._is_nhl[np.asarray(values)]
+
+    def __init__(self, teaminfos: Dict[int, TeamInfo] = None):
+        if teaminfos is None:
+            teaminfos = {}
+        else:
+            self.n_teams = len(teaminfos)
+            team_enum = {teaminfo.acronym: teaminfo.id for teaminfo in teaminfos.values()}
+            team_enum['none'] = Team.none.value
+            team_enum['UFA'] = Team.UFA.value
+            team_enum['Undrafted'] = Team.Undrafted.value
+            self.Team = IntEnum('Team', team_enum)
+        self.teaminfos = teaminfos
+        self._by_value = {team.value: team for team in self.Team}
+        self._by_acronym = {team.name: team for team in self.Team}
+        self._by_name = {}
+        self._by_farm_id = {}
+        for teaminfo in teaminfos.values():
+            team = self.Team(teaminfo.id)
+            self._by_value[teaminfo.id_farm] = team
+            self._by_acronym[teaminfo.acronym_farm] = team
+            self._by_name[teaminfo.name] = team
+            self._by_name[teaminfo.name_farm] = team
+            self._by_farm_id[teaminfo.id_farm] = team
+
+        # Lookup arrays indexed by team id for vectorized masks over player/schedule columns
+        n_values = max(Team.Undrafted.value, 2*self.n_teams) + 1
+        ids = np.arange(n_values)
+        self._is_nhl = (ids >= 1) & (ids <= self.n_teams)
+        self._is_farm = (ids > self.n_teams) & (ids <= 2*self.n_teams)
+        self._ids_parent = np.where(self._is_farm, ids - self.n_teams, ids)
+
+
+registry: TeamRegistry = TeamRegistry()
+registries: Dict[str, TeamRegistry] = {}
 teaminfos_all: Dict[int, TeamInfo] = {}
 
 
-def read_teams(filename: str):
+def parse_teams(lines, filename: str = None) -> Dict[int, TeamInfo]:
+    lines = iter(lines)
+    teams = {}
+    rows = ('name', 'acronym', 'name_arena', 'capacity_arena', 'division')
+    for line in lines:
+        if line.strip() == sentinel:
+            break
+        idx_team = len(teams) + 1
+        teaminfo = {name: (line if idx == 0 else next(lines, '')).strip() for idx, name in enumerate(rows)}
+        try:
+            teaminfo['capacity_arena'] = int(teaminfo['capacity_arena'])
+            teaminfo['division'] = int(teaminfo['division'])
+        except ValueError as err:
+            raise RuntimeError(f'Filename={filename} team #{idx_team} has invalid capacity/division: {err}')
+        teaminfo['id'] = idx_team
+        teams[idx_team] = teaminfo
+    else:
+        raise RuntimeError(f'Filename={filename} has no sentinel={sentinel}')
+    n_teams = len(teams)
+    if not 2*n_teams < Team.UFA.value:
+        raise RuntimeError(f'Filename={filename} has n_teams={n_teams}; farm team ids would overlap Team.UFA')
+    for name, team in teams.items():
+        team['id_farm'] = team['id'] + n_teams
+        team['name_farm'] = next(lines, '').strip()
+        team['acronym_farm'] = next(lines, '').strip()
+        teams[name] = TeamInfo(**team)
+    return teams
+
+
+def read_teams(filename: str) -> TeamRegistry:
     global Team
+    global registry
     global teaminfos_all
 
     with open(filename, 'r') as file:
-        teams = {}
-        rows = ('name', 'acronym', 'name_arena', 'capacity_arena', 'division')
-        for idx_team in range(1, N_TEAMS + 1):
-            teaminfo = {name: file.readline().strip() for name in rows}
-            teaminfo['capacity_arena'] = int(teaminfo['capacity_arena'])
-            teaminfo['division'] = int(teaminfo['division'])
-            teaminfo['id'] = idx_team
-            teaminfo['id_farm'] = idx_team + N_TEAMS
-            teams[idx_team] = teaminfo
-        line = file.readline().strip()
-        if line != sentinel:
-            raise RuntimeError(f'Filename={filename} line={line} != sentinel={sentinel}')
-        for name, team in teams.items():
-            team['name_farm'] = file.readline().strip()
-            team['acronym_farm'] = file.readline().strip()
-            teams[name] = TeamInfo(**team)
-
-    team_enum = {teaminfo.acronym: teaminfo.id for teaminfo in teams.values()}
-    team_enum['none'] = 0
-    team_enum['UFA'] = 98
-    team_enum['Undrafted'] = 99
-
-    Team = IntEnum('Team', team_enum)
-    teaminfos_all = teams
+        content = file.read()
+    key = hashlib.sha1(content.encode()).hexdigest()
+    registry_file = registries.get(key)
+    if registry_file is None:
+        registry_file = TeamRegistry(parse_teams(content.splitlines(), filename=filename))
+        registries[key] = registry_file
+
+    registry = registry_file
+    Team = registry.Team
+    teaminfos_all = registry.teaminfos
+    return registry
@@ -0,0 +1,134 @@
+import argparse
+from dataclasses import dataclass
+import os
+import time
+from typing import List
+
+import contracts as cntr
+import main
+import pipeline as ppln
+import players as plyr
+import teams
+
+
+@dataclass
+class Source:
+    filename: str
+    entry_level: bool
+    extend: bool
+    offset: int = 0
+
+    def read_appended(self) -> List[str]:
+        # Only complete lines; a line still being written is picked up once its newline is
+        try:
+            size = os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            print(f"Warning; {self.filename} shrank from {self.offset} to {size} bytes; only applying lines appended"
+                  f" from now on")
+            self.offset = size
+        if size == self.offset:
+            return []
+        with open(self.filename, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read(size - self.offset)
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        return [line for line in data[:end].decode(cntr.encoding_default).splitlines() if line.strip()]
+
+
+class Watcher:
+    ctx: ppln.Context = None
+    players: plyr.Players = None
+    sources: List[Source] = None
+    written: bool = False
+
+    def poll(self) -> int:
+        ctx = self.ctx
+        time_begin = time.perf_counter()
+        savepoint = self.players.savepoint()
+        n_msgs = len(ctx.errors), len(ctx.warnings), len(ctx.results)
+        n_lines = 0
+        for source in self.sources:
+            lines = source.read_appended()
+            if lines:
+                main.enter_contracts(ctx, source.filename, source.entry_level, source.extend, lines=lines)
+                n_lines += len(lines)
+        for title, msgs, n_old in zip(("Errors:", "Warnings:", "Results:"), (ctx.errors, ctx.warnings, ctx.results),
+                                      n_msgs):
+            if len(msgs) > n_old:
+                print(title)
+                for msg in msgs[n_old:]:
+                    print(msg)
+        self.write(savepoint)
+        if n_lines > 0:
+            print(f"Applied {n_lines} new lines in {1000*(time.perf_counter() - time_begin):.1f}ms")
+        return n_lines
+
+    def run(self, interval: float = 1.):
+        self.poll()
+        print(f"Watching {[source.filename for source in self.sources]}; press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(interval)
+                self.poll()
+        except KeyboardInterrupt:
+            pass
+
+    def write(self, savepoint: int):
+        args = self.ctx.args
+        rows = self.players.journal.rows_changed(savepoint)
+        if args.output is not None and (not self.written or len(rows) > 0):
+            # After the first full write, only re-write the changed players' lines
+            if self.written and args.output[-3:] == 'ehm':
+                self.players.update_ehm(args.output, rows=rows)
+            else:
+                self.players.write(args.output)
+            self.written = True
+        if args.journal is not None and len(rows) > 0:
+            self.players.journal.write(args.journal)
+
+    def __init__(self, args):
+        teams.read_teams(args.config_teams)
+        self.players = plyr.Players(args.players)
+        self.players.name_threshold = args.name_threshold
+        self.ctx = ppln.Context(self.players, args=args)
+        if args.salaries_min is not None:
+            self.ctx.salaries_min = cntr.read_salaries_min(args.salaries_min)
+            self.players.join_salaries_min(self.ctx.salaries_min, default=cntr.salary_min_league)
+        self.sources = [
+            Source(filename, entry_level=entry_level, extend=extend)
+            for filename, entry_level, extend in (
+                (args.elcs, True, False), (args.extensions, False, True), (args.signings, False, False))
+            if filename is not None
+        ]
+        if args.skip_existing:
+            for source in self.sources:
+                source.offset = os.path.getsize(source.filename) if os.path.exists(source.filename) else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Keep a players file loaded and enter contracts as lines are appended to the input files")
+    parser.add_argument('--players', required=True, type=str)
+    parser.add_argument('--config_teams', required=True, type=str)
+    parser.add_argument('--draft_year_last', default=None, type=int)
+    parser.add_argument('--elcs', default=None, type=str)
+    parser.add_argument('--extensions', default=None, type=str)
+    parser.add_argument('--interval', default=1., type=float, help='Seconds between checks for appended lines')
+    parser.add_argument('--journal', default=None, type=str, help='Path to write the log of changed values to')
+    parser.add_argument('--name_threshold', default=None, type=float,
+                        help='Accept the best fuzzy match scoring at least this (0-1) for names not found exactly')
+    parser.add_argument('--output', default=None, type=str)
+    parser.add_argument('--rollback_failed_contracts', action='store_true',
+                        help='Undo each batch of appended lines if any of its entries fail')
+    parser.add_argument('--salaries_min', default=None, type=str)
+    parser.add_argument('--signings', default=None, type=str)
+    parser.add_argument('--skip_existing', action='store_true',
+                        help="Don't enter the lines already in the input files at startup")
+    args = parser.parse_args()
+    if args.elcs is None and args.extensions is None and args.signings is None:
+        parser.error('Nothing to watch; pass at least one of --elcs, --extensions or --signings')
+
+    Watcher(args).run(interval=args.interval)